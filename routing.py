@@ -28,62 +28,352 @@
 from collections import defaultdict
 from mininet.log import info
 
-import networkx as nx
+import heapq
+import ipaddress
+import multiprocessing
 import time
 
-# Build shortest path routing for the given topology
+# Reference bandwidth (Mbit/s) used to derive the cost from the bw
+REFERENCE_BW = 1000
+
+# Link cost functions
+def hopCost(link):
+  return 1
+
+def delayCost(link):
+  return max(1, int(float(link.get('delay', 1) or 1)))
+
+def bwCost(link):
+  bw = float(link.get('bw', REFERENCE_BW) or REFERENCE_BW)
+  return max(1, int(REFERENCE_BW / bw))
+
+# Supported metrics
+COSTS = {'hops': hopCost, 'delay': delayCost, 'bw': bwCost}
+
+# Cost of the cheapest link which is up among the parallel links
+def linkCost(links, cost):
+  costs = [cost(link) for link in links.itervalues() if link.get('up', True)]
+  if len(costs) == 0:
+    return None
+  return min(costs)
+
+# Plain adjacency {node: [(neighbor, cost), ...]} of the links which are up,
+# built once per computation: parallel links count with the cheapest one
+def linkCosts(topology, cost):
+  graph = {}
+  for node in topology:
+    graph[node] = []
+    for neighbor, links in topology[node].iteritems():
+      link_cost = linkCost(links, cost)
+      if link_cost is not None:
+        graph[node].append((neighbor, link_cost))
+  return graph
+
+# Single source shortest paths over the adjacency of linkCosts which keeps
+# only the distances and, for every node, the set of first hops used by
+# the shortest paths
+def firstHops(graph, source):
+  dist = {source: 0}
+  first_hops = {source: set()}
+  done = set()
+  heap = [(0, source)]
+  while len(heap) > 0:
+    d, node = heapq.heappop(heap)
+    if node in done:
+      continue
+    done.add(node)
+    for neighbor, link_cost in graph[node]:
+      new_dist = d + link_cost
+      hops = set([neighbor]) if node == source else first_hops[node]
+      if neighbor not in dist or new_dist < dist[neighbor]:
+        dist[neighbor] = new_dist
+        first_hops[neighbor] = set(hops)
+        heapq.heappush(heap, (new_dist, neighbor))
+      elif new_dist == dist[neighbor] and neighbor not in done:
+        # Equal cost path
+        first_hops[neighbor] |= hops
+  return dist, first_hops
+
+# Translate the next hops of a source in (gateway, device) pairs
+def nextHops(topology, source, hops, interfaces_to_ip, cost, ecmp):
+  nexthops = []
+  for hop in sorted(hops):
+    links = topology[source][hop]
+    link_cost = linkCost(links, cost)
+    for key in sorted(links):
+      link = links[key]
+      if not link.get('up', True) or cost(link) != link_cost:
+        continue
+      nexthops.append((interfaces_to_ip[link['rhs_intf']], link['lhs_intf']))
+      if not ecmp:
+        break
+  return tuple(nexthops)
+
+# Compute the routes of a single source, and its distances if keep_dist,
+# destinations is a list of (destination, attached nodes) pairs. Routes are
+# returned as compact (destination, next hops) pairs, next hops are shared
+# between routes
+def sourceState(topology, graph, source, destinations, interfaces_to_ip, cost, ecmp,
+  keep_dist=False):
+  dist, first_hops = firstHops(graph, source)
+  source_routes = selectRoutes(topology, source, dist, first_hops,
+    destinations, interfaces_to_ip, cost, ecmp)
+  return source, dist if keep_dist else None, source_routes
+
+# Select the routes of a source given its shortest paths
+def selectRoutes(topology, source, dist, first_hops, destinations, interfaces_to_ip, cost, ecmp):
+  source_routes = []
+  # Next hops by closest attached nodes and by first hops, translated once
+  by_closest = {}
+  translated = {}
+  for destination, via in destinations:
+    # If it is directly attached
+    if source in via:
+      continue
+    # Closest attached nodes, loopbacks have only one
+    if len(via) == 1:
+      if via[0] not in dist:
+        continue
+      closest = via
+    else:
+      best = None
+      closest = []
+      for node in via:
+        node_dist = dist.get(node, None)
+        if node_dist is None or (best is not None and node_dist > best):
+          continue
+        if best is None or node_dist < best:
+          best = node_dist
+          closest = [node]
+        else:
+          closest.append(node)
+      if best is None:
+        continue
+    key = tuple(closest)
+    nexthops = by_closest.get(key, None)
+    if nexthops is None:
+      if ecmp:
+        hops = frozenset().union(*[first_hops[node] for node in closest])
+      else:
+        hops = frozenset([min(first_hops[min(closest)])])
+      nexthops = translated.get(hops, None)
+      if nexthops is None:
+        nexthops = nextHops(topology, source, hops, interfaces_to_ip, cost, ecmp)
+        translated[hops] = nexthops
+      by_closest[key] = nexthops
+    source_routes.append((destination, nexthops))
+  return source_routes
+
+# Build the route in the format used by the routers
+def buildRoute(destination, nexthops):
+  route = {'subnet': destination, 'gateway': nexthops[0][0], 'device': nexthops[0][1]}
+  # Multipath route
+  if len(nexthops) > 1:
+    route['nexthops'] = [{'gateway': gateway, 'device': device}
+      for gateway, device in nexthops]
+  return route
+
+# State of the worker processes, inherited at fork time
+_worker = {}
+
+def _initWorker(topology, graph, destinations, interfaces_to_ip, cost, ecmp, keep_dist):
+  _worker['args'] = (destinations, interfaces_to_ip, cost, ecmp, keep_dist)
+  _worker['topology'] = topology
+  _worker['graph'] = graph
+
+def _workerState(source):
+  return sourceState(_worker['topology'], _worker['graph'], source, *_worker['args'])
+
+# Build shortest path routing for the given topology. Only the next hops
+# are computed, running one shortest path computation per source; the
+# sources can be spread across several processes
 class SPFRouting( object ):
 
+  def __init__(self, metric='hops', ecmp=False, processes=1):
+    self.cost = COSTS[metric]
+    self.ecmp = ecmp
+    self.processes = max(1, processes)
+
+  # Sources of the routes, servers do not need routes
+  def sources(self, topology):
+    return [node for node, data in topology.nodes(data=True)
+      if data.get('type') != "server"]
+
+  # Generate the routes of the given sources as (source, distances, routes)
+  # triples, destinations is a sorted list. The distances are None unless
+  # keep_dist. Results are yielded as they are ready, so that the compact
+  # routes of all the sources are not held at once. The pool of processes
+  # is used only if parallel
+  def compute(self, topology, sources, destinations, interfaces_to_ip, keep_dist=False,
+    parallel=True):
+    graph = linkCosts(topology, self.cost)
+    args = (destinations, interfaces_to_ip, self.cost, self.ecmp, keep_dist)
+    if not parallel or self.processes == 1 or len(sources) <= 1:
+      for source in sources:
+        yield sourceState(topology, graph, source, *args)
+      return
+    pool = multiprocessing.Pool(self.processes, _initWorker, (topology, graph) + args)
+    try:
+      chunksize = max(1, len(sources) / (self.processes * 4))
+      for result in pool.imap(_workerState, sources, chunksize):
+        yield result
+    finally:
+      pool.close()
+      pool.join()
+
   def routing(self, routes, topology, destinations, interfaces_to_ip):
     # Init steps
     info("Building routing...\n")
-    # Calculate all the shortest path for the given topology
-    shortest_paths = nx.all_pairs_shortest_path(topology)
-    # Iterate over nodes
-    for node in topology.nodes(data=True):
-      # Access to data
-      node_type   = node[1]['type']
-      # Access to name
-      node        = node[0]
-      # This node is a server
-      if node_type == "server":
-        # Just skip
-        continue
-      # Iterate over destinations:
-      for destination, via in destinations.iteritems():
-        # If it is directly attached
-        if node in via:
-          # Just skip
-          continue
-        # Log the procedure
-        info("Calculating route from " + node + " -> " + destination + "...")
-        # Initialize min via
-        min_via = via[0]
-        # Iterate over remaining via
-        for i in range(1, len(via)):
-          # Get hops of the old via
-          old_hops      = len(shortest_paths[node][min_via])
-          # Get hops of the current via
-          current_hops  = len(shortest_paths[node][via[i]])
-          # Lower
-          if current_hops < old_hops:
-            # Update min_via
-            min_via = via[i]
-        # Init route
-        route = {}
-        # Save the destination
-        route["subnet"]   = destination
-        # Get the link from the topology
-        link_topology     = topology[node][shortest_paths[node][min_via][1]]
-        # Get the gateway. We are assuming no multi-links
-        gateway           = interfaces_to_ip[link_topology[0]["rhs_intf"]]
-        # Save the gateway
-        route["gateway"]  = gateway
-        # Get the device
-        route["device"]   = link_topology[0]["lhs_intf"]
-        # Save the route
-        routes[node].append(route)
-        # Log the found via
-        info("found " + gateway + "\n")
+    start = time.time()
+    sources = self.sources(topology)
+    # Deterministic order of the routes
+    results = self.compute(topology, sources, sorted(destinations.iteritems()),
+      interfaces_to_ip)
+    # Save the routes
+    count = 0
+    for source, _, source_routes in results:
+      routes[source].extend(buildRoute(destination, nexthops)
+        for destination, nexthops in source_routes)
+      count += len(source_routes)
+    info("Built %d routes for %d nodes in %.3fs\n" %(count, len(sources), time.time() - start))
     # Done
-    return routes 
+    return routes
+
+# SPFRouting which keeps the distances and the routes of every source and,
+# on link status changes, recomputes only the sources whose shortest paths
+# use the link
+class IncrementalRouting( SPFRouting ):
+
+  def __init__(self, topology, metric='hops', ecmp=False, processes=1):
+    SPFRouting.__init__(self, metric, ecmp, processes)
+    self.topology = topology
+    # Distances of each source
+    self.dist = {}
+    # Next hops of each source by destination
+    self.routes = {}
+
+  # Compute the routes of all the sources
+  def build(self):
+    info("Building routing...\n")
+    start = time.time()
+    destinations, self.interfaces_to_ip = routingInputs(self.topology)
+    self.destinations = sorted(destinations.iteritems())
+    sources = self.sources(self.topology)
+    self.update(sources)
+    info("Built routing for %d nodes in %.3fs\n" %(len(sources), time.time() - start))
+    return self.current()
+
+  # Recompute the state of the given sources, parallel uses the pool of
+  # processes: link events recompute few sources and do not fork a pool
+  def update(self, sources, parallel=True):
+    results = self.compute(self.topology, sources, self.destinations,
+      self.interfaces_to_ip, keep_dist=True, parallel=parallel)
+    # Save the new state and return the old routes
+    old = {}
+    for source, dist, source_routes in results:
+      old[source] = self.routes.get(source, {})
+      self.dist[source] = dist
+      self.routes[source] = dict(source_routes)
+    return old
+
+  # Routes of all the sources in the format returned by SPFRouting
+  def current(self):
+    routes = defaultdict(list)
+    for source, source_routes in self.routes.iteritems():
+      routes[source].extend(buildRoute(destination, source_routes[destination])
+        for destination in sorted(source_routes))
+    return routes
+
+  # Sources whose shortest paths use (or could use) the directed link
+  def affected(self, lhs, rhs, up):
+    sources = set()
+    if not self.topology.has_edge(lhs, rhs):
+      return sources
+    link_cost = linkCost(self.topology[lhs][rhs], self.cost)
+    if link_cost is None:
+      return sources
+    for source, dist in self.dist.iteritems():
+      if lhs not in dist:
+        continue
+      if up:
+        # The link can shorten or add an equal cost path
+        if rhs not in dist or dist[lhs] + link_cost <= dist[rhs]:
+          sources.add(source)
+      elif rhs in dist and dist[lhs] + link_cost == dist[rhs]:
+        # The link is part of a shortest path
+        sources.add(source)
+    return sources
+
+  # Handle a link status change and return the route deltas by source
+  # as (routes to replace, destinations to delete) pairs
+  def linkStatus(self, lhs, rhs, up):
+    start = time.time()
+    pairs = [(lhs, rhs), (rhs, lhs)]
+    # A link going down affects the sources using it
+    sources = set()
+    if not up:
+      for src, dst in pairs:
+        sources |= self.affected(src, dst, up)
+    # Update the status of all the links between the nodes
+    for src, dst in pairs:
+      if self.topology.has_edge(src, dst):
+        for link in self.topology[src][dst].itervalues():
+          link['up'] = up
+    # A link going up affects the sources which can use it
+    if up:
+      for src, dst in pairs:
+        sources |= self.affected(src, dst, up)
+    deltas = self.deltas(self.update(sorted(sources), parallel=False))
+    info("Link %s-%s %s: %d sources recomputed, %d routers updated in %.3fs\n" %(lhs, rhs,
+      "up" if up else "down", len(sources), len(deltas), time.time() - start))
+    return deltas
+
+  # Recompute all the sources after routers or links are added or removed:
+  # the destinations change, so every source is affected
+  def refresh(self):
+    start = time.time()
+    destinations, self.interfaces_to_ip = routingInputs(self.topology)
+    self.destinations = sorted(destinations.iteritems())
+    sources = self.sources(self.topology)
+    # Forget the removed sources
+    for source in set(self.routes) - set(sources):
+      del self.routes[source]
+      del self.dist[source]
+    deltas = self.deltas(self.update(sources))
+    info("Topology change: %d sources recomputed, %d routers updated in %.3fs\n" %(len(sources),
+      len(deltas), time.time() - start))
+    return deltas
+
+  # Build the deltas from the old routes as (routes to replace,
+  # destinations to delete) pairs by source
+  def deltas(self, old):
+    deltas = {}
+    for source in old:
+      new = self.routes[source]
+      replaced = [buildRoute(destination, new[destination]) for destination in sorted(new)
+        if old[source].get(destination, None) != new[destination]]
+      deleted = [destination for destination in sorted(old[source]) if destination not in new]
+      if len(replaced) > 0 or len(deleted) > 0:
+        deltas[source] = (replaced, deleted)
+    return deltas
+
+# Build the routing inputs from the topology graph: the destinations
+# (loopbacks and core link nets) with the attached routers and the
+# mapping from interfaces to ip addresses
+def routingInputs(topology):
+  destinations = defaultdict(list)
+  interfaces_to_ip = {}
+  # Loopbacks are attached only to their router
+  for node, data in topology.nodes(data=True):
+    loopbackip = data.get('loopbackip', None)
+    if loopbackip:
+      net = str(ipaddress.ip_interface(unicode(loopbackip)).network)
+      destinations[net].append(node)
+  # Core link nets are attached to both the ends
+  for lhs, rhs, data in topology.edges(data=True):
+    lhsip = ipaddress.ip_interface(unicode(data['lhs_ip']))
+    net = str(lhsip.network)
+    if lhs not in destinations[net]:
+      destinations[net].append(lhs)
+    interfaces_to_ip[data['lhs_intf']] = str(lhsip.ip)
+  return destinations, interfaces_to_ip
@@ -0,0 +1,173 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Shared access agent for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from optparse import OptionParser
+
+# General imports
+import json
+import os
+import socket
+import SocketServer
+import subprocess
+import sys
+import threading
+
+# SRv6 dependencies
+from srv6_utils import routerDir
+
+# Socket of the agent
+AGENT_SOCKET = "/tmp/srv6_agent.sock"
+
+# Command executed in the namespaces of a node, mnexec -a
+# attaches to the namespaces of the given pid through setns
+def nsCommand(pid, args):
+  return ['mnexec', '-a', str(pid)] + args
+
+# Serves one request per connection: a json line with the node and
+# the command, the reply is a json line with return code and output
+class AgentHandler(SocketServer.StreamRequestHandler):
+
+  def handle(self):
+    try:
+      request = json.loads(self.rfile.readline())
+      reply = self.server.agent.execute(request)
+    except Exception as e:
+      reply = {'error': str(e)}
+    self.wfile.write(json.dumps(reply) + "\n")
+
+class AgentServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+  daemon_threads = True
+
+# Runs the commands for all the nodes from the root namespace,
+# in place of a sshd in every node
+class NamespaceAgent(object):
+
+  def __init__(self, nodes, path=AGENT_SOCKET):
+    # Pid of the shell of each node
+    self.pids = dict((node.name, node.pid) for node in nodes)
+    self.path = path
+    self.server = None
+    self.thread = None
+
+  # Serve a node added at runtime
+  def addNode(self, node):
+    self.pids[node.name] = node.pid
+
+  # Forget a node removed at runtime, its pid can be reused
+  def removeNode(self, name):
+    self.pids.pop(name, None)
+
+  # Execute a request
+  def execute(self, request):
+    node = request.get('node')
+    if node not in self.pids:
+      return {'error': "unknown node %s" % node}
+    if request.get('sshd', False):
+      return self.startSshd(node)
+    proc = subprocess.Popen(nsCommand(self.pids[node], ['sh', '-c', request['cmd']]),
+      stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = proc.communicate()[0]
+    return {'rc': proc.returncode, 'output': output.decode('utf-8', 'replace')}
+
+  # Start sshd on demand, it goes in background by itself
+  def startSshd(self, node):
+    pidfile = "%s/sshd.pid" % routerDir(node)
+    if os.path.exists(pidfile):
+      return {'rc': 0, 'output': "sshd already running\n"}
+    rc = subprocess.call(nsCommand(self.pids[node],
+      ['/usr/sbin/sshd', '-o', 'PidFile=%s' % pidfile]))
+    return {'rc': rc, 'output': ""}
+
+  # Serve the requests in background
+  def start(self):
+    if os.path.exists(self.path):
+      os.unlink(self.path)
+    self.server = AgentServer(self.path, AgentHandler)
+    self.server.agent = self
+    self.thread = threading.Thread(target=self.server.serve_forever, name="agent")
+    self.thread.daemon = True
+    self.thread.start()
+
+  def stop(self):
+    if self.server is not None:
+      self.server.shutdown()
+      self.server.server_close()
+      self.server = None
+      if os.path.exists(self.path):
+        os.unlink(self.path)
+
+# Client of the agent
+class AgentClient(object):
+
+  def __init__(self, path=AGENT_SOCKET):
+    self.path = path
+
+  def request(self, request):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      sock.connect(self.path)
+      stream = sock.makefile('rw')
+      stream.write(json.dumps(request) + "\n")
+      stream.flush()
+      reply = json.loads(stream.readline())
+    finally:
+      sock.close()
+    if 'error' in reply:
+      raise RuntimeError(reply['error'])
+    return reply
+
+  # Run a command in the node, returns return code and output
+  def cmd(self, node, cmd):
+    reply = self.request({'node': node, 'cmd': cmd})
+    return reply['rc'], reply['output']
+
+  # Start sshd in the node
+  def sshd(self, node):
+    return self.request({'node': node, 'sshd': True})['rc']
+
+# Parse command line options
+def parseOptions():
+  parser = OptionParser(usage="%prog [options] node [command]")
+  parser.add_option('--socket', dest='socket', type='string', default=AGENT_SOCKET,
+                    help='Socket of the agent')
+  parser.add_option('--sshd', dest='sshd', action='store_true',
+                    help='Start sshd in the node')
+  (options, args) = parser.parse_args()
+  if len(args) == 0 or (not options.sshd and len(args) == 1):
+    parser.error("node and command are required")
+  return options, args
+
+if __name__ == '__main__':
+  options, args = parseOptions()
+  client = AgentClient(options.socket)
+  try:
+    if options.sshd:
+      sys.exit(client.sshd(args[0]))
+    rc, output = client.cmd(args[0], " ".join(args[1:]))
+  except (socket.error, RuntimeError) as e:
+    print >> sys.stderr, "Error: %s" % e
+    sys.exit(1)
+  sys.stdout.write(output.encode('utf-8'))
+  sys.exit(rc)
@@ -0,0 +1,189 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Bring-up benchmark for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from optparse import OptionParser
+from collections import OrderedDict
+
+# General imports
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+# Mininet dependencies
+from mininet.log import setLogLevel, info
+from mininet.link import Link, TCLink
+
+# SRv6 dependencies
+import srv6_mininet_extension
+from srv6_mininet_extension import SRv6Topo, dump, stopPartition
+from srv6_parallel import SRv6Mininet
+from srv6_topo_generator import TOPOLOGIES, writeTopology
+from srv6_utils import configTimings
+from srv6_shaping import ShapingEngine, SHAPING_MODES
+
+# Peak RSS (KB) of this process and of its children, ru_maxrss covers
+# the whole lifetime: runIsolated measures each run in a new process
+def peakRSS():
+  return {
+    'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+  }
+
+# Run a single bring-up and return its results
+def benchmark(kind, n, workdir, options):
+  # Reset the global state of the emulation
+  srv6_mininet_extension.topology.clear()
+  srv6_mininet_extension.nodes_to_mgmt.clear()
+  # Generate the topology
+  path = os.path.join(workdir, "%s_%d.json" %(kind, n))
+  writeTopology(path, kind, n)
+  phases = OrderedDict()
+  # Parse, properties and topology build
+  topo = SRv6Topo(topo=path, batch=options.batch_config, routing=options.routing,
+    stream=options.stream_topology, allocator=options.allocator)
+  for phase, elapsed in topo.timings.iteritems():
+    phases['topo.%s' % phase] = elapsed
+  result = OrderedDict([
+    ('kind', kind),
+    ('routers', len(topo.routers)),
+    ('links', len(topo.core_links)),
+    ('workers', options.workers),
+    ('label', options.label),
+    ('phases', phases)
+  ])
+  if not options.no_net:
+    link_cls = TCLink if options.shaping == 'tclink' else Link
+    net = SRv6Mininet(topo=topo, link=link_cls, build=False, controller=None,
+      workers=options.workers,
+      prepare=lambda: srv6_mininet_extension.writeConfigs(topo))
+    try:
+      start = time.time()
+      net.build()
+      phases['net.build'] = time.time() - start
+      # Config steps of the routers, summed over all the nodes
+      for phase, elapsed in configTimings(net.hosts).iteritems():
+        phases['config.%s' % phase] = elapsed
+      if options.shaping == 'batch':
+        start = time.time()
+        ShapingEngine(net, srv6_mininet_extension.topology).apply()
+        phases['shaping'] = time.time() - start
+      start = time.time()
+      net.start()
+      phases['net.start'] = time.time() - start
+      start = time.time()
+      dump()
+      phases['dump'] = time.time() - start
+      result['config_errors'] = len(net.configErrors)
+    finally:
+      # The daemons outlive net.stop, stop them with the nodes
+      start = time.time()
+      stopPartition(net, options.workers)
+      phases['net.stop'] = time.time() - start
+  result['peak_rss_kb'] = peakRSS()
+  return result
+
+# Run a single bring-up in a child process, so that its peak RSS is not
+# the one of a previous (larger) run
+def runIsolated(kind, n, workdir, options):
+  rfd, wfd = os.pipe()
+  pid = os.fork()
+  if pid == 0:
+    os.close(rfd)
+    status = 0
+    try:
+      with os.fdopen(wfd, 'w') as outfile:
+        outfile.write(json.dumps(benchmark(kind, n, workdir, options)))
+    except:
+      traceback.print_exc()
+      status = 1
+    finally:
+      sys.stdout.flush()
+      sys.stderr.flush()
+      os._exit(status)
+  os.close(wfd)
+  with os.fdopen(rfd) as infile:
+    line = infile.read()
+  _, status = os.waitpid(pid, 0)
+  if status != 0:
+    raise RuntimeError("benchmark of %s with %d routers failed" %(kind, n))
+  return line
+
+# Parse command line options
+def parseOptions():
+  parser = OptionParser()
+  # Topologies to be tested
+  parser.add_option('--kinds', dest='kinds', type='string', default="ring,grid,fattree,random",
+                    help='Comma separated topologies: %s' % ", ".join(sorted(TOPOLOGIES)))
+  # Sizes to be tested
+  parser.add_option('--sizes', dest='sizes', type='string', default="10,50,100",
+                    help='Comma separated number of routers')
+  # Output file
+  parser.add_option('--output', dest='output', type='string', default="-",
+                    help='File where the results are appended as json lines, - for stdout')
+  # Label of the run, e.g. the version under test
+  parser.add_option('--label', dest='label', type='string', default="",
+                    help='Label saved with the results')
+  # Skip the Mininet part, useful without root privileges
+  parser.add_option('--no-net', dest='no_net', action='store_true',
+                    help='Benchmark only the preparation of the topology')
+  # Options of the bring-up
+  parser.add_option('--workers', dest='workers', type='int', default=1,
+                    help='Number of workers used to configure the nodes')
+  parser.add_option('--batch-config', dest='batch_config', action='store_true',
+                    help='Apply the configuration of each router in a single batch')
+  parser.add_option('--routing', dest='routing', type='choice', choices=['ospf', 'static'],
+                    default='ospf', help='Routing mode: ospf or static')
+  parser.add_option('--stream-topology', dest='stream_topology', action='store_true',
+                    help='Load the topology file incrementally in a single pass')
+  parser.add_option('--allocator', dest='allocator', type='choice', choices=['generator', 'offset'],
+                    default='generator', help='Properties allocator: generator or offset')
+  parser.add_option('--shaping', dest='shaping', type='choice', choices=SHAPING_MODES,
+                    default='tclink', help='Shaping of the core links: tclink, batch or none')
+  # Parse input parameters
+  (options, args) = parser.parse_args()
+  # Done, return
+  return options
+
+if __name__ == '__main__':
+  opts = parseOptions()
+  setLogLevel('info')
+  workdir = tempfile.mkdtemp(prefix="srv6_benchmark")
+  try:
+    for kind in opts.kinds.split(","):
+      for size in opts.sizes.split(","):
+        info("*** Benchmarking %s with %s routers\n" %(kind, size))
+        line = runIsolated(kind, int(size), workdir, opts)
+        if opts.output == "-":
+          print line
+        else:
+          with open(opts.output, 'a') as outfile:
+            outfile.write(line + "\n")
+  finally:
+    shutil.rmtree(workdir)
@@ -0,0 +1,88 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Build cache for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+# Mininet
+from mininet.log import info, error
+# General imports
+import cPickle as pickle
+import hashlib
+import os
+import tempfile
+
+# SRv6 dependencies
+import srv6_generators
+
+# Version of the cached data, to be increased when its format changes
+CACHE_VERSION = 1
+# Default directory of the cache
+CACHE_DIR = "/tmp/srv6_mininet_cache"
+
+# Version of the properties generator, the hash of its source
+def generatorVersion():
+  version = getattr(srv6_generators, '__version__', None)
+  if version is not None:
+    return str(version)
+  source = os.path.splitext(srv6_generators.__file__)[0] + ".py"
+  if not os.path.exists(source):
+    source = srv6_generators.__file__
+  with open(source, 'rb') as infile:
+    return hashlib.sha1(infile.read()).hexdigest()
+
+# On-disk cache of the build data of a topology file, keyed by the
+# hash of the file, the generator version and the build options
+class SRv6BuildCache(object):
+
+  def __init__(self, topo, cache_dir=CACHE_DIR, options=""):
+    key = hashlib.sha1()
+    with open(topo, 'rb') as infile:
+      for chunk in iter(lambda: infile.read(1 << 20), b''):
+        key.update(chunk)
+    key.update("%s\n%s\n%s" %(CACHE_VERSION, generatorVersion(), options))
+    self.key = key.hexdigest()
+    self.dir = cache_dir
+    self.path = os.path.join(cache_dir, "%s.pickle" % self.key)
+
+  # Return the cached data or None on a miss
+  def load(self):
+    if not os.path.exists(self.path):
+      info("*** Build cache miss (%s)\n" % self.key)
+      return None
+    try:
+      with open(self.path, 'rb') as infile:
+        data = pickle.load(infile)
+    except Exception as e:
+      error("*** Discarding unreadable build cache %s: %s\n" %(self.path, e))
+      return None
+    info("*** Build cache hit (%s)\n" % self.key)
+    return data
+
+  # Store the data atomically
+  def store(self, data):
+    if not os.path.exists(self.dir):
+      os.makedirs(self.dir)
+    fd, path = tempfile.mkstemp(dir=self.dir)
+    with os.fdopen(fd, 'wb') as outfile:
+      pickle.dump(data, outfile, pickle.HIGHEST_PROTOCOL)
+    os.rename(path, self.path)
@@ -0,0 +1,152 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Convergence detection for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import defaultdict
+
+# Mininet
+from mininet.log import info, error
+# IPaddress dependencies
+import ipaddress
+# General imports
+import time
+
+# SRv6 dependencies
+from srv6_parallel import NodeWorkerPool
+from routing import SPFRouting, routingInputs
+
+# Route types printed before the prefix by ip -6 route
+ROUTE_TYPES = ['unicast', 'local', 'broadcast', 'nat', 'anycast', 'multicast']
+# Route types which do not provide reachability
+REJECT_TYPES = ['unreachable', 'blackhole', 'prohibit', 'throw']
+
+# Equal cost next hops installed by ospf6d for a prefix
+OSPF6_MULTIPATH = 4
+
+# Build the routes each router must learn from the topology graph: the
+# nets of the core links and the loopbacks of the other routers, except the
+# ones directly attached, with the outgoing devices of the shortest paths.
+# The devices are compared since ospf6d installs link-local gateways
+def expectedRoutes(topology, nodes=None, metric='hops', ecmp=True):
+  destinations, interfaces_to_ip = routingInputs(topology)
+  spf = SPFRouting(metric, ecmp)
+  if nodes is None:
+    nodes = [node for node, data in topology.nodes(data=True) if data.get('type') == "router"]
+  routes = {}
+  for node, _, source_routes in spf.compute(topology, nodes,
+    sorted(destinations.iteritems()), interfaces_to_ip):
+    routes[node] = dict((ipaddress.ip_network(unicode(destination)),
+      frozenset(device for _, device in nexthops)) for destination, nexthops in source_routes)
+  return routes
+
+# Parse the output of ip -6 route show into the outgoing devices by prefix,
+# multipath routes are printed as nexthop lines or as one line per next hop
+def parseRoutes(output):
+  routes = defaultdict(set)
+  prefix = None
+  for line in output.splitlines():
+    tokens = line.split()
+    # Skip empty lines
+    if len(tokens) == 0:
+      continue
+    if tokens[0] == 'nexthop':
+      if prefix is not None and 'dev' in tokens[:-1]:
+        routes[prefix].add(tokens[tokens.index('dev') + 1])
+      continue
+    prefix = None
+    # Skip reject routes
+    if tokens[0] in REJECT_TYPES:
+      continue
+    if tokens[0] in ROUTE_TYPES and len(tokens) > 1:
+      tokens = tokens[1:]
+    if tokens[0] == 'default':
+      continue
+    try:
+      prefix = ipaddress.ip_network(unicode(tokens[0]))
+    except ValueError:
+      continue
+    routes[prefix]
+    if 'dev' in tokens[:-1]:
+      routes[prefix].add(tokens[tokens.index('dev') + 1])
+  return routes
+
+# True if the installed devices are the ones of the shortest paths, ospf6d
+# installs up to OSPF6_MULTIPATH of the equal cost next hops
+def sameNextHops(installed, expected):
+  return (installed <= expected and len(installed) > 0 and
+    len(installed) >= min(len(expected), OSPF6_MULTIPATH))
+
+# Polls the FIB of the routers until it matches the shortest paths of the topology
+class ConvergenceWatcher(object):
+
+  def __init__(self, net, topology, workers=1, interval=0.5, nodes=None, metric='hops', ecmp=True):
+    self.net = net
+    self.interval = interval
+    self.pool = NodeWorkerPool(workers)
+    # Expected routes for each router, only the given nodes if any
+    self.expected = expectedRoutes(topology, nodes, metric, ecmp)
+    # Time to converge of each router
+    self.converged = {}
+    # Prefixes missing or with other next hops of the routers not converged yet
+    self.missing = {}
+
+  # Prefixes of the node which are missing or use other next hops
+  def check(self, node):
+    installed = parseRoutes(node.cmd('ip -6 route show'))
+    return set(prefix for prefix, devices in self.expected[node.name].iteritems()
+      if not sameNextHops(installed.get(prefix, set()), devices))
+
+  # Block until all the routers converge or the timeout expires
+  def wait(self, timeout=60):
+    info("*** Waiting for convergence of %d routers\n" % len(self.expected))
+    start = time.time()
+    pending = [self.net.get(name) for name in sorted(self.expected)]
+    while len(pending) > 0:
+      results, errors = self.pool.run("Polling FIBs", self.check, pending, quiet=True)
+      now = time.time() - start
+      for node in pending:
+        missing = results.get(node.name, None)
+        if missing is not None and len(missing) == 0:
+          self.converged[node.name] = now
+          self.missing.pop(node.name, None)
+        elif missing is not None:
+          self.missing[node.name] = missing
+      pending = [node for node in pending if node.name not in self.converged]
+      if len(pending) == 0 or now >= timeout:
+        break
+      time.sleep(self.interval)
+    self.report()
+    return len(pending) == 0
+
+  # Log the time to converge of each router
+  def report(self):
+    for name in sorted(self.converged):
+      info("*** %s converged in %.3fs\n" %(name, self.converged[name]))
+    for name in sorted(self.expected):
+      if name not in self.converged:
+        missing = self.missing.get(name, self.expected[name])
+        error("*** %s not converged, %d routes missing or with other next hops\n" %(name,
+          len(missing)))
+    if len(self.converged) == len(self.expected) and len(self.converged) > 0:
+      info("*** Network converged in %.3fs\n" % max(self.converged.values()))
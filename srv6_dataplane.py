@@ -0,0 +1,225 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Data plane benchmark for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import OrderedDict
+
+# Mininet
+from mininet.log import info, error
+# General imports
+import json
+import os
+import random
+import re
+import time
+
+import networkx as nx
+
+# SRv6 dependencies
+from srv6_parallel import NodeWorkerPool
+from srv6_policy import makePolicy
+
+# First port of the iperf servers, one for each pair
+IPERF_PORT = 5201
+# Probes used for the latency
+PING_COUNT = 100
+PING_INTERVAL = 0.01
+# Percentiles of the latency
+PERCENTILES = [50, 90, 99]
+
+# Address of a loopback without the prefix length
+def loopback(topology, router):
+  return topology.node[router]['loopbackip'].split("/")[0]
+
+# Nearest rank percentile of sorted values
+def percentile(values, p):
+  if len(values) == 0:
+    return None
+  return values[max(0, int(-(-p * len(values) // 100)) - 1)]
+
+# Jiffies spent by the machine in the kernel (system, irq and softirq),
+# where the forwarding happens, and in user space
+def cpuTimes():
+  with open("/proc/stat") as infile:
+    values = [int(value) for value in infile.readline().split()[1:]]
+  return {'user': values[0] + values[1], 'kernel': values[2] + values[5] + values[6]}
+
+# A pair of routers and the path between them. Traffic goes from the
+# source to the address of the destination on the last link of the path:
+# it is routed through the net of the link, so the /128 of the SRv6
+# policy never replaces a route of the routing. The policy steers the
+# traffic through the loopback of a router in the middle of the path
+# and the loopback of the destination, where it is decapsulated
+class BenchmarkPair(object):
+
+  def __init__(self, topology, path, port):
+    self.path = path
+    self.source = path[0]
+    self.destination = path[-1]
+    self.waypoint = path[len(path) // 2]
+    self.port = port
+    self.address = topology[path[-2]][path[-1]].values()[0]['rhs_ip'].split("/")[0]
+    # Outgoing interface of the source
+    self.device = topology[path[0]][path[1]].values()[0]['lhs_intf']
+    self.policy = makePolicy("%s/128" % self.address, [loopback(topology, self.waypoint),
+      loopback(topology, self.destination)], self.device)
+
+  def hops(self):
+    return len(self.path) - 1
+
+# Compares SRv6 encap/decap with plain IPv6 forwarding on the same paths
+class DataPlaneBenchmark(object):
+
+  def __init__(self, net, topology, pairs=10, duration=5, workers=1, seed=0):
+    self.net = net
+    self.topology = topology
+    self.count = pairs
+    self.duration = duration
+    self.pool = NodeWorkerPool(workers)
+    self.random = random.Random(seed)
+
+  # Pairs with at least a router between them, every router is the
+  # source of at most one pair so the pairs run in parallel
+  def selectPairs(self):
+    routers = sorted(node for node, data in self.topology.nodes(data=True)
+      if data.get('type') == "router")
+    self.random.shuffle(routers)
+    pairs = []
+    for source in routers:
+      if len(pairs) == self.count:
+        break
+      paths = nx.single_source_shortest_path(self.topology, source)
+      candidates = sorted(target for target, path in paths.iteritems() if len(path) > 2)
+      if len(candidates) == 0:
+        continue
+      path = paths[self.random.choice(candidates)]
+      pairs.append(BenchmarkPair(self.topology, path, IPERF_PORT + len(pairs)))
+    return pairs
+
+  # Round trip times of the pair in ms
+  def latency(self, pair):
+    output = self.net.get(pair.source).cmd("ping -6 -c %d -i %s %s" %(PING_COUNT,
+      PING_INTERVAL, pair.address))
+    return sorted(float(rtt) for rtt in re.findall(r"time=([0-9.]+)", output))
+
+  # Throughput of the pair in Mbit/s
+  def throughput(self, pair):
+    output = self.net.get(pair.source).cmd("iperf -V -c %s -p %d -t %d -y C" %(pair.address,
+      pair.port, self.duration))
+    lines = [line for line in output.splitlines() if line.count(",") >= 8]
+    if len(lines) == 0:
+      return None
+    return float(lines[-1].split(",")[8]) / 1e6
+
+  # Run latency and throughput of all the pairs in parallel
+  def measure(self, mode, pairs):
+    sources = dict((pair.source, pair) for pair in pairs)
+    nodes = [self.net.get(source) for source in sorted(sources)]
+    rtts, _ = self.pool.run("Latency (%s)" % mode, lambda node: self.latency(sources[node.name]),
+      nodes)
+    cpu = cpuTimes()
+    start = time.time()
+    rates, _ = self.pool.run("Throughput (%s)" % mode,
+      lambda node: self.throughput(sources[node.name]), nodes)
+    elapsed = time.time() - start
+    cpu = dict((key, float(value - cpu[key]) / os.sysconf('SC_CLK_TCK'))
+      for key, value in cpuTimes().iteritems())
+    result = OrderedDict([('pairs', []), ('cpu', cpu), ('elapsed', elapsed)])
+    gbit_hops = 0
+    for pair in pairs:
+      values = rtts.get(pair.source, [])
+      rate = rates.get(pair.source, None)
+      result['pairs'].append(OrderedDict([
+        ('source', pair.source), ('destination', pair.destination),
+        ('waypoint', pair.waypoint), ('hops', pair.hops()),
+        ('throughput', rate),
+        ('latency', OrderedDict(("p%d" % p, percentile(values, p)) for p in PERCENTILES)),
+        ('lost', PING_COUNT - len(values))
+      ]))
+      if rate is not None:
+        gbit_hops += rate / 1e3 * self.duration * pair.hops()
+    result['throughput'] = sum(pair['throughput'] or 0 for pair in result['pairs'])
+    # Kernel cpu seconds for each Gbit forwarded by a hop
+    result['cpu_per_gbit_hop'] = cpu['kernel'] / gbit_hops if gbit_hops > 0 else None
+    return result
+
+  # Plain IPv6 first, then the same paths with the SRv6 policies
+  def run(self):
+    pairs = self.selectPairs()
+    if len(pairs) == 0:
+      error("*** No pairs of routers with a router in between\n")
+      return None
+    info("*** Data plane benchmark: %d pairs, %ds of traffic\n" %(len(pairs), self.duration))
+    servers = []
+    for pair in pairs:
+      node = self.net.get(pair.destination)
+      node.cmd("iperf -s -V -B %s -p %d > /dev/null 2>&1 &" %(pair.address, pair.port))
+      servers.append((node, node.lastPid))
+    time.sleep(0.5)
+    results = OrderedDict()
+    policies = dict((pair.source, pair.policy) for pair in pairs)
+    sources = [self.net.get(pair.source) for pair in pairs]
+    try:
+      results['ipv6'] = self.measure("ipv6", pairs)
+      self.pool.run("Installing policies",
+        lambda node: node.installPolicies([policies[node.name]]), sources)
+      try:
+        results['srv6'] = self.measure("srv6", pairs)
+      finally:
+        self.pool.run("Removing policies",
+          lambda node: node.deletePolicies([policies[node.name].prefix]), sources)
+    finally:
+      for node, pid in servers:
+        node.cmd("kill %d" % pid)
+    results['overhead'] = self.overhead(results['ipv6'], results['srv6'])
+    self.report(results)
+    return results
+
+  # Relative cost of SRv6 with respect to plain IPv6
+  def overhead(self, ipv6, srv6):
+    overhead = OrderedDict()
+    if ipv6['throughput'] > 0:
+      overhead['throughput'] = 1 - srv6['throughput'] / ipv6['throughput']
+    for p in PERCENTILES:
+      key = "p%d" % p
+      deltas = [new['latency'][key] - old['latency'][key]
+        for old, new in zip(ipv6['pairs'], srv6['pairs'])
+        if old['latency'][key] is not None and new['latency'][key] is not None]
+      overhead['latency_%s' % key] = sum(deltas) / len(deltas) if len(deltas) > 0 else None
+    if ipv6['cpu_per_gbit_hop'] and srv6['cpu_per_gbit_hop']:
+      overhead['cpu_per_gbit_hop'] = srv6['cpu_per_gbit_hop'] / ipv6['cpu_per_gbit_hop'] - 1
+    return overhead
+
+  def report(self, results):
+    for mode in ['ipv6', 'srv6']:
+      result = results[mode]
+      for pair in result['pairs']:
+        info("*** %s %s->%s (%d hops via %s): %s Mbit/s, rtt %s ms\n" %(mode, pair['source'],
+          pair['destination'], pair['hops'], pair['waypoint'],
+          "%.1f" % pair['throughput'] if pair['throughput'] is not None else "-",
+          "/".join("%.3f" % value if value is not None else "-"
+            for value in pair['latency'].itervalues())))
+      info("*** %s: %.1f Mbit/s, kernel cpu %.2fs\n" %(mode, result['throughput'],
+        result['cpu']['kernel']))
+    info("*** SRv6 overhead: %s\n" % json.dumps(results['overhead']))
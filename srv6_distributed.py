@@ -0,0 +1,198 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Distributed emulation for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from optparse import OptionParser
+
+# General imports
+import os
+import shlex
+import subprocess
+import sys
+import threading
+
+# Mininet dependencies
+from mininet.log import setLogLevel, info, error
+
+# SRv6 dependencies
+from srv6_mininet_extension import SRv6Topo, dump
+from srv6_partition import Partition, partitionTopology, cutLinks, PARTITION_READY
+
+# Script building a partition
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "srv6_mininet_extension.py")
+# Underlay of the local partitions: a bridge in the root namespace
+# and a network namespace for each partition
+UNDERLAY_BRIDGE = "br-srv6-ul"
+UNDERLAY_NET = "10.254.0.%d"
+UNDERLAY_PREFIX = 24
+NETNS = "srv6-part%d"
+
+def run(cmd):
+  subprocess.check_call(shlex.split(cmd))
+
+# Partitions running in network namespaces of this machine
+class LocalUnderlay(object):
+
+  def __init__(self, parts):
+    self.parts = parts
+
+  # Create the namespaces connected to the underlay bridge
+  def setup(self):
+    run("ip link add %s type bridge" % UNDERLAY_BRIDGE)
+    run("ip addr add %s/%d dev %s" %(UNDERLAY_NET % 254, UNDERLAY_PREFIX, UNDERLAY_BRIDGE))
+    run("ip link set %s up" % UNDERLAY_BRIDGE)
+    for index in range(self.parts):
+      netns = NETNS % index
+      run("ip netns add %s" % netns)
+      run("ip link add %s-ul type veth peer name ul0 netns %s" %(netns, netns))
+      run("ip link set %s-ul master %s up" %(netns, UNDERLAY_BRIDGE))
+      run("ip netns exec %s ip addr add %s/%d dev ul0" %(netns, UNDERLAY_NET %(index + 1),
+        UNDERLAY_PREFIX))
+      run("ip netns exec %s ip link set ul0 up" % netns)
+      run("ip netns exec %s ip link set lo up" % netns)
+
+  def addresses(self):
+    return [UNDERLAY_NET %(index + 1) for index in range(self.parts)]
+
+  # Command prefix to run in the partition
+  def prefix(self, index):
+    return ['ip', 'netns', 'exec', NETNS % index]
+
+  # Deleting the namespaces removes all their interfaces
+  def teardown(self):
+    for index in range(self.parts):
+      subprocess.call(['ip', 'netns', 'del', NETNS % index])
+    subprocess.call(['ip', 'link', 'del', UNDERLAY_BRIDGE])
+
+# Partitions running on remote machines reachable through ssh, the
+# hosts are given with their underlay addresses
+class RemoteUnderlay(object):
+
+  def __init__(self, hosts):
+    self.hosts = hosts
+    self.parts = len(hosts)
+
+  def setup(self):
+    pass
+
+  def addresses(self):
+    return list(self.hosts)
+
+  def prefix(self, index):
+    return ['ssh', self.hosts[index], 'sudo']
+
+  def teardown(self):
+    pass
+
+# A running partition: the plan is written on its input and its output
+# is forwarded until the ready line
+class PartitionProcess(object):
+
+  def __init__(self, index, cmd, plan):
+    self.index = index
+    self.ready = threading.Event()
+    self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+      stderr=subprocess.STDOUT)
+    self.process.stdin.write(plan + "\n")
+    self.process.stdin.flush()
+    self.reader = threading.Thread(target=self.forward, name="partition-%d" % index)
+    self.reader.daemon = True
+    self.reader.start()
+
+  def forward(self):
+    for line in iter(self.process.stdout.readline, ''):
+      if line.strip() == PARTITION_READY:
+        self.ready.set()
+      sys.stdout.write("[partition %d] %s" %(self.index, line))
+      sys.stdout.flush()
+    # Exited: do not wait for it anymore
+    self.ready.set()
+
+  def running(self):
+    return self.process.poll() is None
+
+  # Closing the input stops the partition
+  def stop(self):
+    if self.running():
+      self.process.stdin.close()
+    self.process.wait()
+
+# Deploy the emulation across the partitions
+def deploy(options):
+  setLogLevel('info')
+  # Build the whole topology to partition it and to dump it
+  topo = SRv6Topo(topo=options.topology, allocator=options.allocator)
+  if options.hosts:
+    underlay = RemoteUnderlay(options.hosts.split(","))
+  else:
+    underlay = LocalUnderlay(options.partitions)
+  assignment = partitionTopology(topo.routers, topo.core_links, underlay.parts)
+  info("*** Partitions: %d routers in %d partitions, %d cut links out of %d\n" %(len(topo.routers),
+    underlay.parts, len(cutLinks(topo.core_links, assignment)), len(topo.core_links)))
+  plan = Partition(assignment, underlay.addresses(), None).plan()
+  underlay.setup()
+  partitions = []
+  try:
+    for index in range(underlay.parts):
+      cmd = underlay.prefix(index) + [options.python, SCRIPT, '--partition', str(index),
+        '--topology', os.path.abspath(options.topology), '--allocator', options.allocator]
+      partitions.append(PartitionProcess(index, cmd + shlex.split(options.worker_args), plan))
+    for partition in partitions:
+      partition.ready.wait()
+    failed = [partition.index for partition in partitions if not partition.running()]
+    if len(failed) > 0:
+      error("*** Partitions %s failed\n" % ", ".join(str(index) for index in failed))
+      return
+    # Unified dump of the emulation
+    dump()
+    info("*** Emulation running, press enter to stop\n")
+    if not options.no_wait:
+      sys.stdin.readline()
+  finally:
+    for partition in partitions:
+      partition.stop()
+    underlay.teardown()
+
+# Parse command line options
+def parseOptions():
+  parser = OptionParser()
+  parser.add_option('--topology', dest='topology', type='string', default="example_srv6_topology.json",
+                    help='Topology file')
+  parser.add_option('--partitions', dest='partitions', type='int', default=2,
+                    help='Number of local partitions, each one in a network namespace')
+  parser.add_option('--hosts', dest='hosts', type='string', default=None,
+                    help='Comma separated underlay addresses of the remote hosts, one partition each')
+  parser.add_option('--allocator', dest='allocator', type='choice', choices=['generator', 'offset'],
+                    default='generator', help='Properties allocator: generator or offset')
+  parser.add_option('--python', dest='python', type='string', default="python",
+                    help='Python interpreter of the partitions')
+  parser.add_option('--worker-args', dest='worker_args', type='string', default="",
+                    help='Additional options of the partitions')
+  parser.add_option('--no-wait', dest='no_wait', action='store_true',
+                    help='Stop the emulation as soon as it is up')
+  (options, args) = parser.parse_args()
+  return options
+
+if __name__ == '__main__':
+  deploy(parseOptions())
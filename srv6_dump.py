@@ -0,0 +1,159 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Topology dump for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import OrderedDict
+
+# General imports
+import json
+import os
+import tempfile
+
+# Link attributes saved in the dump
+LINK_ATTRIBUTES = ['lhs_intf', 'rhs_intf']
+
+# Address of an interface given as address/prefix
+def interfaceAddress(ip):
+  return ip.split('/', 1)[0]
+
+# Write a file atomically: readers see the old or the new content
+class AtomicFile(object):
+
+  def __init__(self, path):
+    self.path = path
+
+  def __enter__(self):
+    fd, self.tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".",
+      prefix=".%s." % os.path.basename(self.path))
+    self.outfile = os.fdopen(fd, 'w')
+    return self.outfile
+
+  def __exit__(self, exc_type, exc_value, tb):
+    self.outfile.close()
+    if exc_type is None:
+      os.chmod(self.tmp, 0644)
+      os.rename(self.tmp, self.path)
+    else:
+      os.remove(self.tmp)
+    return False
+
+# Dumps the topology graph and the mgmt addresses of the nodes. Nodes and
+# links are serialized once and kept, when the topology changes only the
+# changed ones are serialized again and the files are streamed from the
+# saved fragments
+class TopologyDumper(object):
+
+  def __init__(self, topology_file, nodes_sh, indent=2):
+    self.topology_file = topology_file
+    self.nodes_sh = nodes_sh
+    # None for the compact format
+    self.indent = indent
+    # Serialized nodes and links
+    self.nodes = OrderedDict()
+    self.links = OrderedDict()
+
+  # Serialize an entry of the nodes or links lists
+  def serialize(self, entry):
+    if self.indent is None:
+      return json.dumps(entry, sort_keys=True, separators=(',', ':'))
+    # Entries are nested two levels in the document
+    return json.dumps(entry, sort_keys=True, indent=self.indent, separators=(',', ': ')).replace(
+      "\n", "\n" + " " * (2 * self.indent))
+
+  def serializeNode(self, node, data):
+    entry = dict(data)
+    entry['id'] = node
+    return self.serialize(entry)
+
+  def serializeLink(self, source, target, data):
+    entry = dict((key, data[key]) for key in LINK_ATTRIBUTES)
+    entry['source'] = source
+    entry['target'] = target
+    entry['lhs_ip'] = interfaceAddress(data['lhs_ip'])
+    entry['rhs_ip'] = interfaceAddress(data['rhs_ip'])
+    return self.serialize(entry)
+
+  # Serialize all the topology and write the files
+  def dump(self, topology, nodes_to_mgmt):
+    self.nodes.clear()
+    self.links.clear()
+    for node, data in topology.nodes(data=True):
+      self.nodes[node] = self.serializeNode(node, data)
+    for source, target, key, data in topology.edges(keys=True, data=True):
+      self.links[(source, target, key)] = self.serializeLink(source, target, data)
+    self.write(nodes_to_mgmt)
+
+  # Serialize again only the given nodes and links, (source, target, key)
+  # triples, and write the files. Entries no more in the topology are removed
+  def update(self, topology, nodes_to_mgmt, nodes=[], links=[]):
+    for node in nodes:
+      if topology.has_node(node):
+        self.nodes[node] = self.serializeNode(node, topology.node[node])
+      else:
+        self.nodes.pop(node, None)
+    for source, target, key in links:
+      if topology.has_edge(source, target, key):
+        self.links[(source, target, key)] = self.serializeLink(source, target,
+          topology[source][target][key])
+      else:
+        self.links.pop((source, target, key), None)
+    self.write(nodes_to_mgmt)
+
+  # Stream a list of fragments
+  def writeList(self, outfile, name, fragments, last=False):
+    if self.indent is None:
+      outfile.write('"%s":[' % name)
+      outfile.write(",".join(fragments))
+      outfile.write("]" if last else "],")
+      return
+    pad = " " * self.indent
+    outfile.write('%s"%s": [' % (pad, name))
+    first = True
+    for fragment in fragments:
+      outfile.write("\n" if first else ",\n")
+      outfile.write(pad * 2)
+      outfile.write(fragment)
+      first = False
+    if not first:
+      outfile.write("\n" + pad)
+    outfile.write("]\n" if last else "],\n")
+
+  # Write topology file and nodes.sh atomically
+  def write(self, nodes_to_mgmt):
+    with AtomicFile(self.topology_file) as outfile:
+      if self.indent is None:
+        outfile.write('{"directed":true,"graph":{},')
+        self.writeList(outfile, "links", self.links.itervalues())
+        outfile.write('"multigraph":true,')
+        self.writeList(outfile, "nodes", self.nodes.itervalues(), last=True)
+        outfile.write("}")
+      else:
+        pad = " " * self.indent
+        outfile.write('{\n%s"directed": true,\n%s"graph": {},\n' %(pad, pad))
+        self.writeList(outfile, "links", self.links.itervalues())
+        outfile.write('%s"multigraph": true,\n' % pad)
+        self.writeList(outfile, "nodes", self.nodes.itervalues(), last=True)
+        outfile.write("}")
+    with AtomicFile(self.nodes_sh) as outfile:
+      outfile.write("declare -a NODES=(%s)\n" % " ".join(nodes_to_mgmt.itervalues()))
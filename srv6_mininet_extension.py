@@ -26,12 +26,14 @@
 # @author Alessandro Masci <mascialessandro89@gmail.com>
 
 from optparse import OptionParser
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 import argparse
 import os
 import json
+import signal
 import sys
+import time
 
 # IPaddress dependencies
 from ipaddress import IPv6Network
@@ -42,7 +44,8 @@ from mininet.log import setLogLevel
 from mininet.net import Mininet
 from mininet.topo import Topo
 from mininet.node import RemoteController, OVSBridge, Node
-from mininet.link import TCLink
+from mininet.nodelib import LinuxBridge
+from mininet.link import Link, TCLink
 from mininet.cli import CLI
 
 # NetworkX dependencies
@@ -54,6 +57,22 @@ from srv6_topo_parser import *
 from srv6_utils import *
 from srv6_generators import *
 from srv6_net_utils import *
+from srv6_topo_loader import SRv6TopoLoader
+from srv6_cache import SRv6BuildCache, CACHE_DIR
+from srv6_trace import enableTracing, span
+from srv6_dump import TopologyDumper
+from srv6_teardown import EmulationTeardown
+from srv6_agent import NamespaceAgent
+from srv6_policy import loadPolicies, replaceAllPolicies
+from srv6_partition import PartitionMininet, loadPartition, MGMT_KEY, PARTITION_READY
+from srv6_teardown import NodeState
+from srv6_mutation import TopologyMutator, MutationCLI
+from srv6_shaping import ShapingEngine, SHAPING_MODES
+from srv6_telemetry import TelemetryCollector
+from srv6_dataplane import DataPlaneBenchmark
+from srv6_parallel import *
+from srv6_convergence import *
+from routing import IncrementalRouting
 
 # nodes.sh file for setup of the nodes
 NODES_SH = "/tmp/nodes.sh"
@@ -63,13 +82,90 @@ TOPOLOGY_FILE = "/tmp/topology.json"
 nodes_to_mgmt = {}
 # Network topology
 topology = nx.MultiDiGraph()
+# Dumper of the topology
+dumper = TopologyDumper(TOPOLOGY_FILE, NODES_SH)
 
 # Create SRv6 topology and a management network for the hosts.
 class SRv6Topo(Topo):
 
     # Init of the topology
-    def __init__( self, topo="", **opts ):
+    def __init__( self, topo="", batch=False, routing="ospf", stream=False,
+        allocator="generator", cache=None, sshd_nodes=None, partition=None, **opts ):
+        # Batched configuration of the routers
+        self.batch = batch
+        # Partition of the emulation built here, None for all of it
+        self.partition = partition
+        # Tunnels towards the other partitions (node, intf, port, remote, key)
+        self.tunnels = []
+        # Routers running sshd, None for all the routers
+        self.sshd_nodes = sshd_nodes
+        # Routing mode of the routers
+        self.routing = routing
+        # Properties generator
+        if allocator == "offset":
+            generator = PropertiesAllocator(LoopbackAllocator.prefix, NetAllocator.prefix)
+        else:
+            generator = PropertiesGenerator()
+        mgmtAllocator = MgmtAllocator()
+        # Saved to allocate and release properties at runtime
+        self.generator = generator
+        self.mgmtAllocator = mgmtAllocator
+        # Rendered configs of the routers
+        self.configs = {}
+        # Timings of the preparation phases
+        self.timings = OrderedDict()
+        start = time.time()
+        # Reuse the build data if cached
+        cached = cache.load() if cache is not None else None
+        if cached is not None:
+            self.routers = cached['routers']
+            self.routers_properties = cached['routers_properties']
+            self.core_links = cached['core_links']
+            self.core_links_properties = cached['core_links_properties']
+            self.configs = cached['configs']
+            self.timings['cache'] = time.time() - start
+        elif stream:
+            # Parse the topology and generate the properties in a single pass
+            loader = SRv6TopoLoader(topo, generator, mgmtAllocator)
+            loader.load()
+            self.routers = loader.routers
+            self.routers_properties = loader.routers_properties
+            self.core_links = loader.core_links
+            self.core_links_properties = loader.core_links_properties
+            self.timings['load'] = time.time() - start
+        else:
+            self.parseTopology(topo, generator, mgmtAllocator)
+        # On a cache hit the allocators have not been used yet
+        self.synced = cached is None
+        # Routers built in this partition
+        self.local_routers = [router for router in self.routers
+            if partition is None or partition.isLocal(router)]
+        # Assign mgmt ip to the mgmt station
+        if cached is not None:
+            self.mgmtIP = cached['mgmtIP']
+        else:
+            self.mgmtIP = mgmtAllocator.nextMgmtAddress()
+        # Init steps
+        start = time.time()
+        rendered = len(self.configs)
+        Topo.__init__( self, **opts )
+        self.timings['build'] = time.time() - start
+        # Save the build data, also on a hit if the build rendered configs
+        # missing from the entry (stored by a static run or another partition)
+        if cache is not None and (cached is None or len(self.configs) > rendered):
+            cache.store({
+                'routers': self.routers,
+                'routers_properties': self.routers_properties,
+                'core_links': self.core_links,
+                'core_links_properties': self.core_links_properties,
+                'mgmtIP': self.mgmtIP,
+                'configs': self.configs
+            })
+
+    # Parse the topology file and generate the properties
+    def parseTopology( self, topo, generator, mgmtAllocator ):
         # Parse topology from json file
+        start = time.time()
         parser = SRv6TopoParser(topo, verbose=False)
         parser.parse_data()
         # Save parsed data
@@ -77,29 +173,25 @@ class SRv6Topo(Topo):
         p_routers_properties = parser.getRoutersProperties()
         self.core_links = parser.getCoreLinks()
         p_core_links_properties = parser.getCoreLinksProperties()
-        # Properties generator
-        generator = PropertiesGenerator()
-        mgmtAllocator = MgmtAllocator()
+        self.timings['parse'] = time.time() - start
+        start = time.time()
         # Second step is the generation of the nodes parameters
         routers_properties = generator.getRoutersProperties(self.routers)
-        for router_properties, p_router_properties in zip(routers_properties, p_routers_properties):
+        mgmt_addresses = mgmtAllocator.nextMgmtAddresses(len(self.routers))
+        for router_properties, p_router_properties, mgmt_address in zip(routers_properties,
+            p_routers_properties, mgmt_addresses):
             p_router_properties['loopback'] = router_properties.loopback
             p_router_properties['routerid'] = router_properties.routerid
-            p_router_properties['mgmtip'] = mgmtAllocator.nextMgmtAddress()
+            p_router_properties['mgmtip'] = mgmt_address
         self.routers_properties = p_routers_properties
-        # Assign mgmt ip to the mgmt station
-        self.mgmtIP = mgmtAllocator.nextMgmtAddress()
         # Third step is the generation of the links parameters
-        core_links_properties = []
-        for core_link in self.core_links:
-            core_links_properties.append(generator.getLinksProperties([core_link]))
+        core_links_properties = generator.getLinksProperties(self.core_links)
         for core_link_properties, p_core_link_properties in zip(core_links_properties, p_core_links_properties):
-            p_core_link_properties['iplhs'] = core_link_properties[0].iplhs
-            p_core_link_properties['iprhs'] = core_link_properties[0].iprhs
-            p_core_link_properties['net'] = core_link_properties[0].net
+            p_core_link_properties['iplhs'] = core_link_properties.iplhs
+            p_core_link_properties['iprhs'] = core_link_properties.iprhs
+            p_core_link_properties['net'] = core_link_properties.net
         self.core_links_properties = p_core_links_properties
-        # Init steps
-        Topo.__init__( self, **opts )
+        self.timings['properties'] = time.time() - start
 
     # Build the topology using parser information
     def build( self, *args, **params ):
@@ -109,103 +201,225 @@ class SRv6Topo(Topo):
         Topo.build( self, *args, **params )
                 # Add routers
         for router, router_properties in zip(self.routers, self.routers_properties):
-            # Assign mgmtip, loobackip, routerid
-            mgmtIP = router_properties['mgmtip']
-            loopbackIP = router_properties['loopback']
-            routerid = router_properties['routerid']
-            loopbackip = "%s/%s" % (loopbackIP, LoopbackAllocator.prefix)
-            mgmtip = "%s/%s" % (mgmtIP, MgmtAllocator.prefix)
+            params = self.routerParams(router, router_properties)
             # Add the router to the topology
-            self.addHost(name=router, cls=SRv6Router, sshd=True, mgmtip=mgmtip,
-                loopbackip=loopbackip, routerid=routerid, nets=[])
-            # Save mapping node to mgmt
-            nodes_to_mgmt[router] = str(mgmtIP)
-            # Add node to the topology graph
-            topology.add_node(router, mgmtip=mgmtip , loopbackip=loopbackip,
-                routerid=routerid, type="router")
+            if self.isLocal(router):
+                self.addHost(name=router, **params)
         # Create the mgmt switch
-        br_mgmt = self.addSwitch(name='br-mgmt1', cls=OVSBridge)
+        # Linux bridge in a partition, it may run in a network namespace
+        br_cls = OVSBridge if self.partition is None else LinuxBridge
+        br_mgmt = self.addSwitch(name=MGMT_BRIDGE, cls=br_cls)
         # Assign the mgmt ip to the mgmt station
         mgmtIP = self.mgmtIP
         mgmtip = "%s/%s" % (mgmtIP, MgmtAllocator.prefix)
         # Mgmt name
-        mgmt = 'mgmt'
-        # Create the mgmt node in the root namespace
-        self.addHost(name=mgmt, cls=SRv6Router, sshd=False, mgmtip=mgmtip,
-            inNamespace=False)
+        mgmt = MGMT_NODE
         nodes_to_mgmt[mgmt] = str(mgmtIP)
-        # Create a link between mgmt switch and mgmt station
-        self.addLink(mgmt, br_mgmt, bw=1000, delay=0)
+        if self.partition is None or self.partition.index == self.partition.mgmt:
+            # Create the mgmt node in the root namespace
+            self.addHost(name=mgmt, cls=SRv6Router, sshd=False, mgmtip=mgmtip,
+                inNamespace=False, batch=self.batch)
+            # Create a link between mgmt switch and mgmt station, never shaped
+            self.addLink(mgmt, br_mgmt, cls=Link)
+        # The mgmt switches of the partitions are joined to the one of the mgmt station
+        if self.partition is not None:
+            partition = self.partition
+            if partition.index == partition.mgmt:
+                remotes = [index for index in range(len(partition.underlays))
+                    if index != partition.mgmt]
+            else:
+                remotes = [partition.index]
+            for index in remotes:
+                peer = partition.underlays[index if index != partition.index else partition.mgmt]
+                self.tunnels.append((br_mgmt, "%s-gre%d" %(br_mgmt, index), None, peer,
+                    MGMT_KEY + index))
         # Connect all the routers to the management network
-        for router in self.routers:
-            # Create a link between mgmt switch and the router
-            self.addLink(router, br_mgmt, bw=1000, delay=0)
+        for router in self.local_routers:
+            # Create a link between mgmt switch and the router, never shaped
+            self.addLink(router, br_mgmt, cls=Link)
         # Iterate over the core links and generate them
-        for core_link, core_link_properties in zip(self.core_links, self.core_links_properties):
+        for index, (core_link, core_link_properties) in enumerate(zip(self.core_links,
+            self.core_links_properties)):
             # Get the left hand side of the pair
             lhs = core_link[0]
             # Get the right hand side of the pair
             rhs = core_link[1]
-            # Create the core link
-            self.addLink(lhs, rhs, bw=core_link_properties['bw'],
-                delay=core_link_properties['delay'])
+            if self.isLocal(lhs) and self.isLocal(rhs):
+                # Create the core link
+                self.addLink(lhs, rhs, bw=core_link_properties['bw'],
+                    delay=core_link_properties['delay'])
+            else:
+                # Only reserve the ports, the names of the interfaces do not change
+                self.addPort(lhs, rhs, self.nextPort(lhs), self.nextPort(rhs))
             # Get Port number
             portNumber = self.port(lhs, rhs)
-            # Create lhs_intf
-            lhsintf = "%s-eth%d" % (lhs, portNumber[0])
-            # Create rhs_intf
-            rhsintf = "%s-eth%d" % (rhs, portNumber[1])
-            # Assign a data-plane net to this link
-            net = core_link_properties['net']
-            # Get lhs ip
-            lhsip = "%s/%d" % (core_link_properties['iplhs'], NetAllocator.prefix)
-            # Get rhs ip
-            rhsip = "%s/%d" % (core_link_properties['iprhs'], NetAllocator.prefix)
-            # Add edge to the topology
-            topology.add_edge(lhs, rhs, lhs_intf=lhsintf, rhs_intf=rhsintf, lhs_ip=lhsip, rhs_ip=rhsip)
-            # Add the reverse edge to the topology
-            topology.add_edge(rhs, lhs, lhs_intf=rhsintf, rhs_intf=lhsintf, lhs_ip=rhsip, rhs_ip=lhsip)
+            lhsnet, rhsnet = self.coreLinkNets(lhs, rhs, portNumber, core_link_properties)
+            lhsintf = lhsnet['intf']
+            rhsintf = rhsnet['intf']
             # Save net
-            lhsnet = {'intf':lhsintf, 'ip':lhsip, 'net':net}
-            rhsnet = {'intf':rhsintf, 'ip':rhsip, 'net':net}
-            self.nodeInfo(lhs)['nets'].append(lhsnet)
-            self.nodeInfo(rhs)['nets'].append(rhsnet)
+            if self.isLocal(lhs):
+                self.nodeInfo(lhs)['nets'].append(lhsnet)
+            if self.isLocal(rhs):
+                self.nodeInfo(rhs)['nets'].append(rhsnet)
+            # Stitch the link towards the other partition with a tunnel
+            if self.isLocal(lhs) and not self.isLocal(rhs):
+                self.tunnels.append((lhs, lhsintf, portNumber[0],
+                    self.partition.address(rhs), index + 1))
+            elif self.isLocal(rhs) and not self.isLocal(lhs):
+                self.tunnels.append((rhs, rhsintf, portNumber[1],
+                    self.partition.address(lhs), index + 1))
+        # Render the Quagga configs of all the routers in one pass
+        if self.routing == 'ospf':
+            for router, router_properties in zip(self.routers, self.routers_properties):
+                if not self.isLocal(router):
+                    continue
+                if router not in self.configs:
+                    node_info = self.nodeInfo(router)
+                    nets = node_info['nets'] + [{'intf':'lo', 'ip':node_info['loopbackip'],
+                        'net':node_info['loopbackip']}]
+                    self.configs[router] = quaggaConfigs(router, routerDir(router), nets,
+                        router_properties['routerid'])
+                self.nodeInfo(router)['configs'] = self.configs[router]
+
+
+    # True if the router is built in this partition
+    def isLocal( self, router ):
+        return self.partition is None or self.partition.isLocal(router)
+
+    # Next free port of a router. Routers are hosts: their ports start from 0
+    # with the mgmt port, which is not in this topology for a remote router
+    def nextPort( self, router ):
+        return len(self.ports.get(router, {})) + (0 if self.isLocal(router) else 1)
+
+    # The allocators are skipped on a cache hit: replay the allocations
+    # of the cached properties before allocating new ones at runtime
+    def syncAllocators( self ):
+        if self.synced:
+            return
+        self.generator.getRoutersProperties(self.routers)
+        self.generator.getLinksProperties(self.core_links)
+        # One mgmt address for each router and one for the mgmt station
+        self.mgmtAllocator.nextMgmtAddresses(len(self.routers) + 1)
+        self.synced = True
+
+    # Allocate the properties of a router added at runtime and reserve
+    # its mgmt port, the first one of the router
+    def newRouter( self, router ):
+        if router in self.routers:
+            raise ValueError("router %s already exists" % router)
+        self.syncAllocators()
+        properties = self.generator.getRoutersProperties([router])[0]
+        router_properties = {'loopback': properties.loopback, 'routerid': properties.routerid,
+            'mgmtip': self.mgmtAllocator.nextMgmtAddress()}
+        self.routers.append(router)
+        self.routers_properties.append(router_properties)
+        self.local_routers.append(router)
+        self.ports.pop(router, None)
+        ports = self.addPort(router, MGMT_BRIDGE, 0, len(self.ports.get(MGMT_BRIDGE, {})) + 1)
+        return router_properties, ports
+
+    # Allocate the properties and the ports of a core link added at runtime
+    def newCoreLink( self, lhs, rhs, bw, delay ):
+        self.syncAllocators()
+        properties = self.generator.getLinksProperties([(lhs, rhs)])[0]
+        core_link_properties = {'bw': bw, 'delay': delay, 'iplhs': properties.iplhs,
+            'iprhs': properties.iprhs, 'net': properties.net}
+        self.core_links.append((lhs, rhs))
+        self.core_links_properties.append(core_link_properties)
+        ports = self.addPort(lhs, rhs, self.nextPort(lhs), self.nextPort(rhs))
+        return core_link_properties, ports
+
+    # Release the properties of a router removed at runtime
+    def releaseRouter( self, router ):
+        index = self.routers.index(router)
+        router_properties = self.routers_properties[index]
+        del self.routers[index]
+        del self.routers_properties[index]
+        self.local_routers.remove(router)
+        self.configs.pop(router, None)
+        nodes_to_mgmt.pop(router, None)
+        # The generator does not support the release
+        if hasattr(self.generator, 'releaseLoopback'):
+            self.generator.releaseLoopback(router_properties['loopback'])
+        self.mgmtAllocator.releaseMgmtAddress(router_properties['mgmtip'])
+
+    # Release the properties of the core link with the given net
+    def releaseCoreLink( self, net ):
+        index = [properties['net'] for properties in self.core_links_properties].index(net)
+        del self.core_links[index]
+        del self.core_links_properties[index]
+        if hasattr(self.generator, 'releaseNet'):
+            self.generator.releaseNet(net)
+
+    # Add the router to the topology graph and return the params of its node
+    def routerParams( self, router, router_properties ):
+        # Assign mgmtip, loobackip, routerid
+        mgmtIP = router_properties['mgmtip']
+        loopbackIP = router_properties['loopback']
+        routerid = router_properties['routerid']
+        loopbackip = "%s/%s" % (loopbackIP, LoopbackAllocator.prefix)
+        mgmtip = "%s/%s" % (mgmtIP, MgmtAllocator.prefix)
+        sshd = self.sshd_nodes is None or router in self.sshd_nodes
+        # Save mapping node to mgmt
+        nodes_to_mgmt[router] = str(mgmtIP)
+        # Add node to the topology graph
+        topology.add_node(router, mgmtip=mgmtip , loopbackip=loopbackip,
+            routerid=routerid, type="router")
+        return dict(cls=SRv6Router, sshd=sshd, mgmtip=mgmtip, loopbackip=loopbackip,
+            routerid=routerid, nets=[], batch=self.batch, routing=self.routing)
+
+    # Add the core link to the topology graph and return the nets of its ends
+    def coreLinkNets( self, lhs, rhs, portNumber, core_link_properties ):
+        # Create lhs_intf
+        lhsintf = "%s-eth%d" % (lhs, portNumber[0])
+        # Create rhs_intf
+        rhsintf = "%s-eth%d" % (rhs, portNumber[1])
+        # Assign a data-plane net to this link
+        net = core_link_properties['net']
+        # Get lhs ip
+        lhsip = "%s/%d" % (core_link_properties['iplhs'], NetAllocator.prefix)
+        # Get rhs ip
+        rhsip = "%s/%d" % (core_link_properties['iprhs'], NetAllocator.prefix)
+        # Get bw and delay, used as link costs
+        bw = core_link_properties['bw']
+        delay = core_link_properties['delay']
+        # Add edge to the topology
+        topology.add_edge(lhs, rhs, lhs_intf=lhsintf, rhs_intf=rhsintf, lhs_ip=lhsip, rhs_ip=rhsip,
+            bw=bw, delay=delay)
+        # Add the reverse edge to the topology
+        topology.add_edge(rhs, lhs, lhs_intf=rhsintf, rhs_intf=lhsintf, lhs_ip=rhsip, rhs_ip=lhsip,
+            bw=bw, delay=delay)
+        return {'intf':lhsintf, 'ip':lhsip, 'net':net}, {'intf':rhsintf, 'ip':rhsip, 'net':net}
+
+# Utility function to write the rendered configs of the routers, it
+# runs in parallel with the creation of the nodes
+def writeConfigs( topo ):
+    # Lookup the owner once
+    owner = quaggaOwner()
+    routers = [router for router in topo.local_routers if router in topo.configs]
+    for router in routers:
+        writeQuaggaConfigs(routerDir(router), topo.configs[router], owner)
+    # Routers which do not need to write their configs
+    return routers
 
-        
 # Utility function to dump relevant information of the emulation
 def dump():
-  # Json dump of the topology
-  with open(TOPOLOGY_FILE, 'w') as outfile:
-    # Get json topology
-    json_topology = json_graph.node_link_data(topology)
-    # Convert links
-    json_topology['links'] = [
-        {
-            'source': json_topology['nodes'][link['source']]['id'],
-            'target': json_topology['nodes'][link['target']]['id'],
-            'lhs_intf': link['lhs_intf'],
-            'rhs_intf': link['rhs_intf'],
-            'lhs_ip': str((ipaddress.ip_interface(link['lhs_ip'])).ip),
-            'rhs_ip': str((ipaddress.ip_interface(link['rhs_ip'])).ip)
-        }
-        for link in json_topology['links']]
-    # Dump the topology
-    json.dump(json_topology, outfile, sort_keys = True, indent = 2)
-  # Dump for nodes.sh
-  with open(NODES_SH, 'w') as outfile:
-    # Create header
-    nodes = "declare -a NODES=("
-    # Iterate over management ips
-    for node, ip in nodes_to_mgmt.iteritems():
-      # Add the nodes one by one
-      nodes = nodes + "%s " % ip
-    if nodes_to_mgmt != {}:
-        # Eliminate last character
-        nodes = nodes[:-1] + ")\n"
-    else:
-        nodes = nodes + ")\n"
-    # Write on the file
-    outfile.write(nodes)
+  # Serialize everything and write the files
+  dumper.dump(topology, nodes_to_mgmt)
+
+# Utility function to update the dump after a change of the topology,
+# only the given nodes and (source, target, key) links are serialized
+def dumpChanges(nodes=[], links=[]):
+  dumper.update(topology, nodes_to_mgmt, nodes, links)
+
+# Utility function to push the route changes caused by a link event
+def updateRoutes(net, incremental, lhs, rhs, status):
+    # Compute the deltas
+    deltas = incremental.linkStatus(lhs, rhs, status == 'up')
+    # Push them only to the affected routers
+    routers = [net.get(router) for router in sorted(deltas)]
+    net.pool.run("Updating routes",
+        lambda router: router.installRoutes(*deltas[router.name]), routers)
 
 # Utility function to shutdown the emulation
 def stopAll():
@@ -216,6 +430,16 @@ def stopAll():
     # Restart root ssh daemon
     os.system('service sshd restart')
 
+# Utility function to shutdown a partition, other partitions
+# may run on the same machine: only its nodes are stopped
+def stopPartition( net, workers ):
+    # Look up the daemons before their pid files are removed
+    nodes = [NodeState(node.name) for node in net.hosts]
+    processes = dict((node.name, node.processes()) for node in nodes)
+    net.stop()
+    NodeWorkerPool(workers).run("Stopping daemons",
+        lambda node: node.stop(processes=processes[node.name]), nodes)
+
 # Utility function to deploy Mininet topology
 def deploy( options ):
     # Retrieves options
@@ -223,33 +447,181 @@ def deploy( options ):
     topologyFile = options.topology
     clean_all = options.clean_all
     no_cli = options.no_cli
+    batch_config = options.batch_config
+    workers = options.workers
+    wait_converged = options.wait_converged
+    convergence_timeout = options.convergence_timeout
+    routing = options.routing
+    spf_metric = options.spf_metric
+    ecmp = options.ecmp
+    stream_topology = options.stream_topology
+    allocator = options.allocator
+    trace = options.trace
+    teardown = options.teardown
+    access = options.access
+    # Routers running sshd, all of them without the agent
+    sshd_nodes = None
+    if access == 'agent':
+        sshd_nodes = set(node for node in options.sshd_nodes.split(",") if node != "")
+    # Partition of a distributed emulation, the plan comes from the coordinator
+    partition = None
+    if options.partition is not None:
+        partition = loadPartition(sys.stdin.readline(), options.partition)
+    # Compact dump of the topology
+    if options.compact_dump:
+        dumper.indent = None
     # Clean all - clean and exit
     if clean_all:
-        stopAll()
-        return
+        if teardown == 'targeted':
+            setLogLevel('info')
+            EmulationTeardown(TOPOLOGY_FILE, workers).run()
+        else:
+            stopAll()
+        return True
+    # Build cache, not needed to clean the environment
+    cache = None
+    if options.cache:
+        cache = SRv6BuildCache(topologyFile, options.cache_dir, options=allocator)
+    # Enable tracing, SIGUSR1 dumps the trace of a stalled bring-up
+    if trace:
+        tracer = enableTracing()
+        signal.signal(signal.SIGUSR1, lambda signum, frame: tracer.write(trace))
     # Set Mininet log level to info
     setLogLevel('info')
     # Create Mininet topology
-    topo = SRv6Topo(topo=topologyFile)
+    with span("topology"):
+        topo = SRv6Topo(topo=topologyFile, batch=batch_config, routing=routing,
+            stream=stream_topology, allocator=allocator, cache=cache, sshd_nodes=sshd_nodes,
+            partition=partition)
     # Create Mininet net
-    net = Mininet(topo=topo, link=TCLink,
-        build=False, controller=None)
+    net_cls = SRv6Mininet if partition is None else PartitionMininet
+    # Core links are shaped by TCLink or later by the shaping engine
+    link_cls = TCLink if options.shaping == 'tclink' else Link
+    net = net_cls(topo=topo, link=link_cls,
+        build=False, controller=None, workers=workers,
+        prepare=lambda: writeConfigs(topo))
     # Add manually external controller
     net.addController("c0", controller=RemoteController, ip=controller)
     # Build topology
-    net.build()
+    with span("net.build"):
+        net.build()
+    # Log the configuration timings of the routers
+    logConfigTimings(net.hosts)
+    # Shape the core links with a tc batch per router
+    shaper = ShapingEngine(net, topology)
+    if options.shaping == 'batch':
+        with span("shaping"):
+            shaper.apply()
+    # Compute and install the static routes
+    incremental = None
+    if routing == 'static':
+        with span("static routing"):
+            incremental = IncrementalRouting(topology, spf_metric, ecmp, workers)
+            routes = incremental.build()
+            routers = [net.get(router) for router in sorted(topo.local_routers)]
+            net.pool.run("Installing static routes",
+                lambda router: router.installRoutes(routes[router.name]), routers)
+        # Recompute only the affected routes on link events
+        net.linkListeners.append(lambda lhs, rhs, status:
+            updateRoutes(net, incremental, lhs, rhs, status))
     # Start topology
-    net.start()
-    # dump information
-    dump()
+    with span("net.start"):
+        net.start()
+    # dump information, the coordinator dumps a distributed emulation
+    if partition is None:
+        with span("dump"):
+            dump()
+    # Sample the routers in background
+    telemetry = None
+    if options.telemetry:
+        path = options.telemetry
+        # The partitions of a machine share the file system
+        if partition is not None:
+            path = "%s.%d" %(path, partition.index)
+        telemetry = TelemetryCollector(net, topology, path, options.telemetry_interval, workers)
+        telemetry.start()
+    # Install the SRv6 policies
+    if options.policies:
+        with span("policies"):
+            local = set(topo.local_routers)
+            policies = loadPolicies(options.policies)
+            replaceAllPolicies(net, dict((node, node_policies) for node, node_policies
+                in policies.iteritems() if node in local), workers)
+    # Wait for the convergence of the routing, ospf6d uses unit costs and
+    # installs all the equal cost next hops
+    if routing == 'ospf':
+        fib_metric, fib_ecmp = 'hops', True
+    else:
+        fib_metric, fib_ecmp = spf_metric, ecmp
+    converged = True
+    if wait_converged:
+        with span("convergence"):
+            converged = ConvergenceWatcher(net, topology, workers=workers,
+                nodes=topo.local_routers, metric=fib_metric,
+                ecmp=fib_ecmp).wait(convergence_timeout)
+    # Compare SRv6 and plain IPv6 forwarding, the routing has to be converged
+    if options.dataplane_pairs > 0 and partition is None:
+        with span("data plane benchmark"):
+            if not wait_converged:
+                converged = ConvergenceWatcher(net, topology, workers=workers,
+                    metric=fib_metric, ecmp=fib_ecmp).wait(convergence_timeout)
+            results = DataPlaneBenchmark(net, topology, options.dataplane_pairs,
+                options.dataplane_duration, workers).run()
+            if options.dataplane_output and results is not None:
+                with open(options.dataplane_output, 'w') as outfile:
+                    json.dump(results, outfile, indent=2)
+    # Measure the shaping of some core links
+    if options.validate_shaping > 0:
+        with span("shaping validation"):
+            shaper.validate(options.validate_shaping)
+    # Write the trace of the bring-up
+    if trace:
+        tracer.summary()
+        tracer.write(trace)
+    # A partition runs until the coordinator closes its input
+    if partition is not None:
+        print PARTITION_READY
+        sys.stdout.flush()
+        sys.stdin.read()
+        if telemetry is not None:
+            telemetry.stop()
+        with span("teardown"):
+            stopPartition(net, workers)
+        return converged
+    # Shared agent in place of the sshd of the routers
+    agent = None
+    if access == 'agent':
+        agent = NamespaceAgent([net.get(router) for router in topo.local_routers])
+        agent.start()
+    # Runtime changes of the topology
+    mutator = TopologyMutator(net, topo, topology, dumpChanges, incremental,
+        shaper if options.shaping == 'batch' else None, agent)
+    if options.control:
+        mutator.start()
     # Show Mininet prompt
     if not no_cli:
         # Mininet CLI
-        CLI(net)
-        # Stop topology
-        net.stop()
-        # Clean all
-        stopAll()
+        MutationCLI(net, mutator)
+        mutator.stop()
+        if telemetry is not None:
+            telemetry.stop()
+        if agent is not None:
+            agent.stop()
+        if teardown == 'targeted':
+            # Stop only the processes and links of this emulation
+            with span("teardown"):
+                EmulationTeardown(TOPOLOGY_FILE, workers).run()
+        else:
+            # Stop topology
+            with span("net.stop"):
+                net.stop()
+            # Clean all
+            stopAll()
+        # Write again the trace, including the teardown
+        if trace:
+            tracer.write(trace)
+    # False if the routing did not converge
+    return converged
 
 # Parse command line options and dump results
 def parseOptions():
@@ -260,17 +632,103 @@ def parseOptions():
     # Topology json file
     parser.add_option('--topology', dest='topology', type='string', default="example_srv6_topology.json",
                       help='Topology file')
+    # Load the topology file in a single pass
+    parser.add_option('--stream-topology', dest='stream_topology', action='store_true',
+                      help='Load the topology file incrementally in a single pass')
+    # Allocator of the properties
+    parser.add_option('--allocator', dest='allocator', type='choice', choices=['generator', 'offset'],
+                      default='generator', help='Properties allocator: generator or offset')
+    # Reuse the build data of the same topology file
+    parser.add_option('--cache', dest='cache', action='store_true',
+                      help='Cache the build data of the topology file')
+    # Directory of the build cache
+    parser.add_option('--cache-dir', dest='cache_dir', type='string', default=CACHE_DIR,
+                      help='Directory of the build cache')
     # Clean all useful for rdcl stop action
     parser.add_option('--stop-all', dest='clean_all',action='store_true', help='Clean all mininet environment')
+    # Teardown mode
+    parser.add_option('--teardown', dest='teardown', type='choice', choices=['full', 'targeted'],
+                      default='full', help='Teardown: full (mn -c and killall) or targeted (only this emulation)')
+    # Access to the routers
+    parser.add_option('--access', dest='access', type='choice', choices=['sshd', 'agent'],
+                      default='sshd', help='Access to the routers: sshd in every router or a shared agent')
+    # Routers running sshd with the agent
+    parser.add_option('--sshd-nodes', dest='sshd_nodes', type='string', default="",
+                      help='Comma separated routers running sshd with the agent')
     # Start without Mininet prompt - useful for rdcl start action
     parser.add_option('--no-cli', dest='no_cli',action='store_true', help='Do not show Mininet CLI')
+    # Configure each router with a single command
+    parser.add_option('--batch-config', dest='batch_config', action='store_true',
+                      help='Apply the configuration of each router in a single batch')
+    # Number of workers used to configure the nodes
+    parser.add_option('--workers', dest='workers', type='int', default=1,
+                      help='Number of workers used to configure the nodes')
+    # Routing mode
+    parser.add_option('--routing', dest='routing', type='choice', choices=['ospf', 'static'],
+                      default='ospf', help='Routing mode: ospf (Quagga) or static (precomputed SPF)')
+    # Metric used by the static routing
+    parser.add_option('--spf-metric', dest='spf_metric', type='choice', choices=['hops', 'delay', 'bw'],
+                      default='hops', help='Link cost used by the static routing: hops, delay or bw')
+    # Multipath static routes
+    parser.add_option('--ecmp', dest='ecmp', action='store_true',
+                      help='Install all the equal cost next hops in static routing')
+    # Wait for the convergence of the routing before returning
+    parser.add_option('--wait-converged', dest='wait_converged', action='store_true',
+                      help='Wait until the FIBs of all the routers match the shortest paths, '
+                      'next hops included, exit status 1 if they do not')
+    # Timeout for the convergence
+    parser.add_option('--convergence-timeout', dest='convergence_timeout', type='float',
+                      default=60, help='Seconds to wait for the convergence')
+    # Compact json dump of the topology
+    parser.add_option('--compact-dump', dest='compact_dump', action='store_true',
+                      help='Dump the topology in compact json')
+    # SRv6 policies installed after the start
+    parser.add_option('--policies', dest='policies', type='string', default=None,
+                      help='Json file with the SRv6 policies of the routers')
+    # Shaping of the core links
+    parser.add_option('--shaping', dest='shaping', type='choice', choices=SHAPING_MODES,
+                      default='tclink', help='Shaping of the core links: tclink, batch (tc -batch) or none')
+    # Measure the shaping
+    parser.add_option('--validate-shaping', dest='validate_shaping', type='int', default=0,
+                      help='Measure bandwidth and delay of the given number of core links')
+    # Telemetry of the routers
+    parser.add_option('--telemetry', dest='telemetry', type='string', default=None,
+                      help='Write the counters and the route counts of the routers in the given file')
+    parser.add_option('--telemetry-interval', dest='telemetry_interval', type='float', default=1,
+                      help='Seconds between two telemetry samples')
+    # Data plane benchmark
+    parser.add_option('--dataplane-pairs', dest='dataplane_pairs', type='int', default=0,
+                      help='Compare SRv6 and IPv6 forwarding between the given number of router pairs')
+    parser.add_option('--dataplane-duration', dest='dataplane_duration', type='int', default=5,
+                      help='Seconds of traffic of the data plane benchmark')
+    parser.add_option('--dataplane-output', dest='dataplane_output', type='string', default=None,
+                      help='Write the results of the data plane benchmark in the given json file')
+    # Control socket changing the topology at runtime
+    parser.add_option('--control', dest='control', action='store_true',
+                      help='Accept topology changes on the control socket')
+    # Partition of a distributed emulation, started by srv6_distributed.py
+    parser.add_option('--partition', dest='partition', type='int', default=None,
+                      help='Build only the given partition, the plan is read from stdin')
+    # Chrome trace of the bring-up
+    parser.add_option('--trace', dest='trace', type='string', default=None,
+                      help='Write a Chrome trace (json) of the bring-up in the given file')
     # Parse input parameters
     (options, args) = parser.parse_args()
+    # The agent, the telemetry and the control socket run in this process, which exits right
+    # after the bring-up without the CLI (a partition instead runs until the coordinator stops it)
+    if options.no_cli and options.partition is None:
+        if options.access == 'agent':
+            parser.error("--access agent requires the Mininet CLI, it stops with --no-cli")
+        if options.telemetry:
+            parser.error("--telemetry requires the Mininet CLI, it stops with --no-cli")
+        if options.control:
+            parser.error("--control requires the Mininet CLI, it stops with --no-cli")
     # Done, return
     return options
 
 if __name__ == '__main__':
     # Let's parse input parameters
     opts = parseOptions()
-    # Deploy topology
-    deploy(opts)
+    # Deploy topology, the exit status reports a failed convergence
+    if not deploy(opts):
+        sys.exit(1)
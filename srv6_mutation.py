@@ -0,0 +1,280 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Runtime changes of the topology for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from optparse import OptionParser
+
+# Mininet
+from mininet.cli import CLI
+from mininet.link import Link
+from mininet.log import info, error
+# General imports
+import os
+import sys
+import threading
+import time
+
+# SRv6 dependencies
+from srv6_agent import AgentServer, AgentHandler, AgentClient
+from srv6_parallel import configHost
+from srv6_teardown import NodeState
+from srv6_utils import MGMT_BRIDGE
+
+# Socket of the control server
+CONTROL_SOCKET = "/tmp/srv6_control.sock"
+# Default properties of the links added at runtime
+DEFAULT_BW = 100
+DEFAULT_DELAY = 1000
+
+# Numeric bw or delay given as a string
+def toNumber(value):
+  value = float(value)
+  return int(value) if value.is_integer() else value
+
+# Adds and removes routers and core links in the running emulation.
+# Only the affected routers are configured and the dump is updated
+# incrementally through dump(nodes, links)
+class TopologyMutator(object):
+
+  def __init__(self, net, topo, topology, dump, incremental=None, shaper=None, agent=None):
+    self.net = net
+    self.topo = topo
+    self.topology = topology
+    self.dump = dump
+    # Routing state of the static routing, None with ospf
+    self.incremental = incremental
+    # Shaping engine of the core links, None if shaped by the links
+    self.shaper = shaper
+    # Shared agent of the routers, None with sshd in every router
+    self.agent = agent
+    # Changes come from the CLI and from the control socket, the CLI
+    # holds the lock while its commands use the node shells
+    self.lock = threading.RLock()
+    self.server = None
+
+  def router(self, name):
+    if name not in self.topo.routers:
+      raise ValueError("unknown router %s" % name)
+    return self.net.get(name)
+
+  # Add a router connected only to the mgmt network
+  def addRouter(self, name):
+    with self.lock:
+      start = time.time()
+      router_properties, ports = self.topo.newRouter(name)
+      params = self.topo.routerParams(name, router_properties)
+      router = self.net.addHost(name, **params)
+      link = self.net.addLink(router, self.net.get(MGMT_BRIDGE), ports[0], ports[1], cls=Link)
+      self.net.get(MGMT_BRIDGE).attach(link.intf2)
+      # The config starts sshd only in the routers of --sshd-nodes
+      configHost(router)
+      if self.agent is not None:
+        self.agent.addNode(router)
+      self.dump([name])
+      info("*** Added router %s in %.3fs\n" %(name, time.time() - start))
+
+  # Remove a router and its links
+  def removeRouter(self, name):
+    with self.lock:
+      start = time.time()
+      router = self.router(name)
+      if self.agent is not None:
+        self.agent.removeNode(name)
+      neighbors = set(self.topology.successors(name))
+      links = []
+      for neighbor in neighbors:
+        while self.topology.has_edge(name, neighbor):
+          links.extend(self.deleteLink(name, neighbor))
+      # Look up the daemons before their pid files are removed
+      state = NodeState(name)
+      processes = state.processes()
+      bridge = self.net.get(MGMT_BRIDGE)
+      for link in self.net.linksBetween(router, bridge):
+        bridge.detach(link.intf2)
+        self.net.delLink(link)
+      self.net.delHost(router)
+      state.stop(processes=processes)
+      self.topology.remove_node(name)
+      self.topo.releaseRouter(name)
+      self.updateRouting(neighbors)
+      self.dump([name], links)
+      info("*** Removed router %s in %.3fs\n" %(name, time.time() - start))
+
+  # Add a core link between two routers
+  def addLink(self, lhs, rhs, bw=DEFAULT_BW, delay=DEFAULT_DELAY):
+    bw = toNumber(bw)
+    delay = toNumber(delay)
+    with self.lock:
+      start = time.time()
+      lhs_router = self.router(lhs)
+      rhs_router = self.router(rhs)
+      core_link_properties, ports = self.topo.newCoreLink(lhs, rhs, bw, delay)
+      lhsnet, rhsnet = self.topo.coreLinkNets(lhs, rhs, ports, core_link_properties)
+      self.net.addLink(lhs_router, rhs_router, ports[0], ports[1], bw=bw, delay=delay)
+      lhs_router.addNet(lhsnet)
+      rhs_router.addNet(rhsnet)
+      if self.shaper is not None:
+        self.shaper.apply([(lhs, rhs, self.topology[lhs][rhs][self.edgeKey(lhs, rhs, lhsnet['intf'])]),
+          (rhs, lhs, self.topology[rhs][lhs][self.edgeKey(rhs, lhs, rhsnet['intf'])])])
+      self.updateRouting([lhs, rhs])
+      self.dump([], [(lhs, rhs, self.edgeKey(lhs, rhs, lhsnet['intf'])),
+        (rhs, lhs, self.edgeKey(rhs, lhs, rhsnet['intf']))])
+      info("*** Added link %s-%s in %.3fs\n" %(lhs, rhs, time.time() - start))
+
+  # Remove the last core link added between two routers
+  def removeLink(self, lhs, rhs):
+    with self.lock:
+      start = time.time()
+      self.router(lhs)
+      self.router(rhs)
+      if not self.topology.has_edge(lhs, rhs):
+        raise ValueError("no link between %s and %s" %(lhs, rhs))
+      links = self.deleteLink(lhs, rhs)
+      self.updateRouting([lhs, rhs])
+      self.dump([], links)
+      info("*** Removed link %s-%s in %.3fs\n" %(lhs, rhs, time.time() - start))
+
+  # Key of the edge leaving from the given interface
+  def edgeKey(self, lhs, rhs, intf):
+    for key, data in self.topology[lhs][rhs].iteritems():
+      if data['lhs_intf'] == intf:
+        return key
+    return None
+
+  # Delete a core link, returns the removed (source, target, key) edges
+  def deleteLink(self, lhs, rhs):
+    key = max(self.topology[lhs][rhs])
+    data = self.topology[lhs][rhs][key]
+    lhsintf, rhsintf = data['lhs_intf'], data['rhs_intf']
+    rkey = self.edgeKey(rhs, lhs, rhsintf)
+    lhs_router = self.net.get(lhs)
+    rhs_router = self.net.get(rhs)
+    net = [net['net'] for net in lhs_router.nets if net['intf'] == lhsintf][0]
+    for link in self.net.linksBetween(lhs_router, rhs_router):
+      if set([link.intf1.name, link.intf2.name]) == set([lhsintf, rhsintf]):
+        self.net.delLink(link)
+    lhs_router.removeNet(lhsintf)
+    rhs_router.removeNet(rhsintf)
+    self.topology.remove_edge(lhs, rhs, key)
+    self.topology.remove_edge(rhs, lhs, rkey)
+    self.topo.releaseCoreLink(net)
+    return [(lhs, rhs, key), (rhs, lhs, rkey)]
+
+  # Update the routing of the affected routers: static routes are
+  # recomputed and pushed as deltas, Quagga is restarted with the new nets
+  def updateRouting(self, routers):
+    if self.incremental is not None:
+      deltas = self.incremental.refresh()
+      nodes = [self.net.get(router) for router in sorted(deltas) if router in self.net]
+      self.net.pool.run("Updating routes", lambda node: node.installRoutes(*deltas[node.name]),
+        nodes)
+    else:
+      nodes = [self.net.get(router) for router in sorted(routers) if router in self.net]
+      self.net.pool.run("Restarting routing", lambda node: node.restartRouting(), nodes)
+
+  # Execute a request of the control socket
+  def execute(self, request):
+    op = request.get('op')
+    args = request.get('args', [])
+    ops = {'add_router': self.addRouter, 'remove_router': self.removeRouter,
+      'add_link': self.addLink, 'remove_link': self.removeLink}
+    if op not in ops:
+      return {'error': "unknown operation %s" % op}
+    try:
+      ops[op](*args)
+    except (ValueError, KeyError, TypeError) as e:
+      return {'error': str(e)}
+    return {'rc': 0}
+
+  # Serve the control socket in background
+  def start(self, path=CONTROL_SOCKET):
+    if os.path.exists(path):
+      os.unlink(path)
+    self.path = path
+    self.server = AgentServer(path, AgentHandler)
+    self.server.agent = self
+    thread = threading.Thread(target=self.server.serve_forever, name="control")
+    thread.daemon = True
+    thread.start()
+
+  def stop(self):
+    if self.server is not None:
+      self.server.shutdown()
+      self.server.server_close()
+      self.server = None
+      if os.path.exists(self.path):
+        os.unlink(self.path)
+
+# Mininet CLI with the commands changing the topology
+class MutationCLI(CLI):
+
+  def __init__(self, net, mutator, **kwargs):
+    self.mutator = mutator
+    CLI.__init__(self, net, **kwargs)
+
+  # A node shell runs one command at a time: the mutations of the
+  # control socket wait for the command of the CLI to complete
+  def onecmd(self, line):
+    with self.mutator.lock:
+      return CLI.onecmd(self, line)
+
+  def mutate(self, line, count, func):
+    args = line.split()
+    if len(args) < count:
+      error("invalid number of args\n")
+      return
+    try:
+      func(*args)
+    except (ValueError, KeyError, TypeError) as e:
+      error("%s\n" % e)
+
+  def do_add_router(self, line):
+    "add_router name: add a router connected to the mgmt network"
+    self.mutate(line, 1, lambda name: self.mutator.addRouter(name))
+
+  def do_remove_router(self, line):
+    "remove_router name: remove a router and its links"
+    self.mutate(line, 1, lambda name: self.mutator.removeRouter(name))
+
+  def do_add_link(self, line):
+    "add_link lhs rhs [bw] [delay]: add a core link"
+    self.mutate(line, 2, lambda lhs, rhs, bw=DEFAULT_BW, delay=DEFAULT_DELAY:
+      self.mutator.addLink(lhs, rhs, bw, delay))
+
+  def do_remove_link(self, line):
+    "remove_link lhs rhs: remove the last core link added between two routers"
+    self.mutate(line, 2, lambda lhs, rhs: self.mutator.removeLink(lhs, rhs))
+
+if __name__ == '__main__':
+  parser = OptionParser(usage="%prog [options] add_router|remove_router|add_link|remove_link args")
+  parser.add_option('--socket', dest='socket', type='string', default=CONTROL_SOCKET,
+                    help='Control socket of the emulation')
+  (options, args) = parser.parse_args()
+  if len(args) == 0:
+    parser.error("operation is required")
+  try:
+    AgentClient(options.socket).request({'op': args[0], 'args': args[1:]})
+  except Exception as e:
+    print >> sys.stderr, "Error: %s" % e
+    sys.exit(1)
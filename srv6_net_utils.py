@@ -23,7 +23,59 @@
 # @author Pier Luigi Ventre <pierventre@hotmail.com>
 # @author Stefano Salsano <stefano.salsano@uniroma2.it>
 
-from ipaddress import IPv6Network, IPv4Network
+from collections import namedtuple
+from ipaddress import IPv6Network, IPv4Network, IPv6Address, IPv4Address
+
+import heapq
+
+# Properties of a router and of a link, same fields of the generators ones
+RouterProperties = namedtuple('RouterProperties', ['loopback', 'routerid'])
+LinkProperties = namedtuple('LinkProperties', ['iplhs', 'iprhs', 'net'])
+
+# Allocates blocks of a network by offset using integer arithmetic.
+# Released offsets are reused lowest first, so the allocation is
+# deterministic for a given sequence of requests
+class OffsetAllocator(object):
+
+  def __init__(self, net, prefix, first=1):
+    network = IPv6Network(unicode(net))
+    self.net = net
+    self.base = int(network.network_address)
+    self.prefix = prefix
+    self.step = 1 << (128 - prefix)
+    self.size = network.num_addresses / self.step
+    self.next = first
+    self.released = []
+
+  # Allocate a single offset
+  def allocate(self):
+    if len(self.released) > 0:
+      return heapq.heappop(self.released)
+    if self.next >= self.size:
+      raise ValueError("No more blocks available in %s" % self.net)
+    self.next = self.next + 1
+    return self.next - 1
+
+  # Allocate n offsets in one call
+  def allocateMany(self, n):
+    reused = [heapq.heappop(self.released) for _ in range(min(n, len(self.released)))]
+    n = n - len(reused)
+    if self.next + n > self.size:
+      raise ValueError("No more blocks available in %s" % self.net)
+    self.next = self.next + n
+    return reused + range(self.next - n, self.next)
+
+  # Give back an offset
+  def release(self, offset):
+    heapq.heappush(self.released, offset)
+
+  # Integer value of the block at the given offset
+  def value(self, offset):
+    return self.base + offset * self.step
+
+  # Offset of the given address
+  def offset(self, address):
+    return (int(IPv6Address(unicode(str(address)))) - self.base) / self.step
 
 # Allocates mgmt address
 class MgmtAllocator(object):
@@ -34,8 +86,54 @@ class MgmtAllocator(object):
 
   def __init__(self): 
     print "*** Calculating Available Mgmt Addresses"
-    self.mgmtnet = (IPv6Network(self.net)).hosts()
+    self.mgmtnet = OffsetAllocator(self.net, 128)
   
   def nextMgmtAddress(self):
-    n_host = next(self.mgmtnet)
-    return n_host.__str__()
\ No newline at end of file
+    return str(IPv6Address(self.mgmtnet.value(self.mgmtnet.allocate())))
+
+  # Allocate n mgmt addresses in one call
+  def nextMgmtAddresses(self, n):
+    return [str(IPv6Address(self.mgmtnet.value(offset)))
+      for offset in self.mgmtnet.allocateMany(n)]
+
+  def releaseMgmtAddress(self, address):
+    self.mgmtnet.release(self.mgmtnet.offset(address))
+
+# Allocates loopbacks, router ids and link nets by offset. It can be used
+# in place of the PropertiesGenerator and supports the release of the
+# properties of the routers and links removed at runtime
+class PropertiesAllocator(object):
+
+  loopbacknet = unicode("2002::/64")
+  linksnet = unicode("2001::/48")
+
+  def __init__(self, loopback_prefix=128, net_prefix=64):
+    self.loopbacks = OffsetAllocator(self.loopbacknet, loopback_prefix)
+    self.nets = OffsetAllocator(self.linksnet, net_prefix)
+
+  # Router properties, the router id is derived from the loopback offset
+  def routerProperties(self, offset):
+    return RouterProperties(str(IPv6Address(self.loopbacks.value(offset))),
+      str(IPv4Address(offset)))
+
+  # Link properties, lhs gets the first host and rhs the second
+  def linkProperties(self, offset):
+    value = self.nets.value(offset)
+    return LinkProperties(str(IPv6Address(value + 1)), str(IPv6Address(value + 2)),
+      "%s/%d" % (IPv6Address(value), self.nets.prefix))
+
+  # Bulk allocation for the given routers
+  def getRoutersProperties(self, routers):
+    return [self.routerProperties(offset) for offset in self.loopbacks.allocateMany(len(routers))]
+
+  # Bulk allocation for the given links
+  def getLinksProperties(self, links):
+    return [self.linkProperties(offset) for offset in self.nets.allocateMany(len(links))]
+
+  # Release the loopback (and the router id) of a removed router
+  def releaseLoopback(self, loopback):
+    self.loopbacks.release(self.loopbacks.offset(loopback))
+
+  # Release the net of a removed link
+  def releaseNet(self, net):
+    self.nets.release(self.nets.offset(IPv6Network(unicode(net)).network_address))
@@ -0,0 +1,161 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Parallel bring-up for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from multiprocessing.pool import ThreadPool
+
+# SRv6 dependencies
+from srv6_trace import span
+
+# Mininet
+from mininet.net import Mininet
+from mininet.log import info, error
+# General imports
+import threading
+import time
+import traceback
+
+# Runs a function over a set of nodes using a pool of workers.
+# Nodes own a shell connected through a pty, they cannot be moved
+# to another process: threads are used and the work is I/O bound
+class NodeWorkerPool(object):
+
+  def __init__(self, workers=1):
+    self.workers = max(1, workers)
+
+  # Apply func to every node and return results and errors by node name,
+  # quiet skips the summary of phases repeated many times (e.g. polls)
+  def run(self, phase, func, nodes, quiet=False):
+    with span(phase):
+      return self.runPhase(phase, func, nodes, quiet)
+
+  def runPhase(self, phase, func, nodes, quiet=False):
+    start = time.time()
+    # Wrap func to collect per-node result, error and time
+    def work(node):
+      begin = time.time()
+      try:
+        with span(phase, "node", node.name):
+          result = func(node)
+        return (node.name, result, None, time.time() - begin)
+      except Exception:
+        return (node.name, None, traceback.format_exc(), time.time() - begin)
+    # Run the work
+    if self.workers == 1 or len(nodes) <= 1:
+      outcomes = [work(node) for node in nodes]
+    else:
+      pool = ThreadPool(min(self.workers, len(nodes)))
+      try:
+        outcomes = pool.map(work, nodes)
+      finally:
+        pool.close()
+        pool.join()
+    # Collect the outcomes
+    results = {}
+    errors = {}
+    timings = {}
+    for name, result, err, elapsed in outcomes:
+      timings[name] = elapsed
+      if err is not None:
+        errors[name] = err
+      else:
+        results[name] = result
+    # Deterministic summary
+    if not quiet:
+      self.summary(phase, nodes, errors, timings, time.time() - start)
+    return results, errors
+
+  # Log a summary of the phase, nodes are reported in name order
+  def summary(self, phase, nodes, errors, timings, elapsed):
+    info("*** %s: %d nodes, %d failed, %d workers, %.3fs\n" %(phase,
+      len(nodes), len(errors), self.workers, elapsed))
+    if len(timings) > 0:
+      slowest = max(sorted(timings), key=lambda name: timings[name])
+      info("*** %s: slowest node %s (%.3fs)\n" %(phase, slowest, timings[slowest]))
+    for name in sorted(errors):
+      error("*** %s: %s failed\n%s" %(phase, name, errors[name]))
+
+
+# Configure a host as Mininet.configHosts does
+def configHost(host):
+  intf = host.defaultIntf()
+  if intf:
+    host.configDefault()
+  else:
+    # Don't configure nonexistent intf
+    host.configDefault(ip=None, mac=None)
+
+# Mininet whose hosts are configured in parallel. The config
+# of a SRv6Router also launches its routing daemons
+class SRv6Mininet(Mininet):
+
+  def __init__(self, workers=1, prepare=None, **kwargs):
+    # Pool used for the bring-up
+    self.pool = NodeWorkerPool(workers)
+    # Preparation stage run in parallel with the creation of the nodes,
+    # it returns the names of the nodes whose configs are prepared
+    self.prepare = prepare
+    self.preparer = None
+    self.prepared = []
+    # Configuration errors by node name
+    self.configErrors = {}
+    # Functions called on link status changes
+    self.linkListeners = []
+    Mininet.__init__(self, **kwargs)
+
+  # Start the preparation stage and build the network
+  def build(self):
+    if self.prepare is not None:
+      self.preparer = threading.Thread(target=self.runPrepare, name="prepare")
+      self.preparer.start()
+    Mininet.build(self)
+
+  # Run the preparation stage, errors are logged
+  def runPrepare(self):
+    start = time.time()
+    try:
+      self.prepared = self.prepare()
+    except Exception:
+      error("*** Preparation failed\n%s" % traceback.format_exc())
+      self.prepared = []
+    info("*** Prepared %d nodes in %.3fs\n" %(len(self.prepared), time.time() - start))
+
+  # Configure the hosts using the pool of workers
+  def configHosts(self):
+    # Wait for the preparation stage
+    if self.preparer is not None:
+      self.preparer.join()
+      self.preparer = None
+      for name in self.prepared:
+        if name in self.nameToNode:
+          self.nameToNode[name].params['prepared'] = True
+    _, self.configErrors = self.pool.run("Configuring hosts", configHost, self.hosts)
+
+  # Change the link status and notify the listeners
+  def configLinkStatus(self, src, dst, status):
+    Mininet.configLinkStatus(self, src, dst, status)
+    if src not in self.nameToNode or dst not in self.nameToNode:
+      return
+    for listener in self.linkListeners:
+      listener(src, dst, status)
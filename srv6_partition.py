@@ -0,0 +1,157 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Partitioning of the emulation for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import defaultdict
+
+# Mininet
+from mininet.link import Intf
+from mininet.log import info
+from mininet.util import quietRun
+# General imports
+import heapq
+import json
+
+# SRv6 dependencies
+from srv6_parallel import SRv6Mininet
+
+# Key of the mgmt tunnels, the core tunnels use the index of the link
+MGMT_KEY = 0x10000
+# Line written by a partition when its part of the emulation is up
+PARTITION_READY = "*** Partition ready"
+# Passes of the refinement of the partitions
+REFINE_PASSES = 10
+
+# Undirected adjacency of the routers, parallel links count once each
+def adjacency(routers, core_links):
+  neighbors = dict((router, defaultdict(int)) for router in routers)
+  for lhs, rhs in core_links:
+    neighbors[lhs][rhs] += 1
+    neighbors[rhs][lhs] += 1
+  return neighbors
+
+# Split the routers in balanced partitions minimising the cut links.
+# Partitions are grown one at a time from a peripheral router taking
+# the router with most links towards the partition, then routers are
+# moved to the partition of most of their neighbors if the balance allows
+def partitionTopology(routers, core_links, parts):
+  parts = max(1, min(parts, len(routers)))
+  neighbors = adjacency(routers, core_links)
+  capacity = -(-len(routers) // parts)
+  minimum = len(routers) // parts
+  assignment = {}
+  sizes = [0] * parts
+  # Peripheral routers first
+  seeds = sorted(routers, key=lambda router: (len(neighbors[router]), router))
+  for part in range(parts):
+    # The last partition takes the remaining routers
+    limit = capacity if part < parts - 1 else len(routers)
+    gains = defaultdict(int)
+    heap = []
+    while sizes[part] < limit and len(assignment) < len(routers):
+      router = None
+      while len(heap) > 0:
+        gain, candidate = heapq.heappop(heap)
+        if candidate not in assignment and -gain == gains[candidate]:
+          router = candidate
+          break
+      # Disconnected or first router: take a new seed
+      if router is None:
+        router = next(seed for seed in seeds if seed not in assignment)
+      assignment[router] = part
+      sizes[part] += 1
+      for neighbor, count in neighbors[router].iteritems():
+        if neighbor not in assignment:
+          gains[neighbor] += count
+          heapq.heappush(heap, (-gains[neighbor], neighbor))
+  # Refinement
+  for _ in range(REFINE_PASSES):
+    moved = 0
+    for router in sorted(routers):
+      source = assignment[router]
+      links = defaultdict(int)
+      for neighbor, count in neighbors[router].iteritems():
+        links[assignment[neighbor]] += count
+      best = max(sorted(links), key=lambda part: links[part]) if len(links) > 0 else source
+      if (best != source and links[best] > links[source] and sizes[best] < capacity
+          and sizes[source] > minimum):
+        assignment[router] = best
+        sizes[source] -= 1
+        sizes[best] += 1
+        moved += 1
+    if moved == 0:
+      break
+  return assignment
+
+# Core links whose routers are in different partitions
+def cutLinks(core_links, assignment):
+  return [(lhs, rhs) for lhs, rhs in core_links if assignment[lhs] != assignment[rhs]]
+
+# A partition of the emulation: the assignment of the routers, the
+# underlay address of every partition and the index of the local one
+class Partition(object):
+
+  def __init__(self, assignment, underlays, index, mgmt=0):
+    self.assignment = assignment
+    self.underlays = underlays
+    self.index = index
+    # Partition hosting the mgmt station
+    self.mgmt = mgmt
+
+  def isLocal(self, router):
+    return self.assignment[router] == self.index
+
+  # Underlay address of the partition of the router
+  def address(self, router):
+    return self.underlays[self.assignment[router]]
+
+  def local(self):
+    return self.underlays[self.index]
+
+  # Serialized plan, the same for all the partitions
+  def plan(self):
+    return json.dumps({'assignment': self.assignment, 'underlays': self.underlays,
+      'mgmt': self.mgmt})
+
+# Read the plan of the emulation for the given partition
+def loadPartition(plan, index):
+  data = json.loads(plan)
+  return Partition(dict((str(router), part) for router, part in data['assignment'].iteritems()),
+    [str(underlay) for underlay in data['underlays']], index, data['mgmt'])
+
+# Mininet building only a partition of the emulation: the links
+# towards the other partitions are gretap tunnels over the underlay
+class PartitionMininet(SRv6Mininet):
+
+  def buildFromTopo(self, topo=None):
+    SRv6Mininet.buildFromTopo(self, topo)
+    info('*** Adding tunnels:\n')
+    local = topo.partition.local()
+    for node, name, port, remote, key in topo.tunnels:
+      quietRun("ip link add %s type gretap local %s remote %s key %d"
+        %(name, local, remote, key))
+      # Moved in the namespace of the node and set up
+      Intf(name, node=self[node], port=port)
+      info('(%s, %s) ' %(name, remote))
+    info('\n')
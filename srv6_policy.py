@@ -0,0 +1,94 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Bulk SRv6 policies for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import namedtuple
+from ipaddress import IPv6Address, IPv6Network
+
+# Mininet
+from mininet.log import info
+# General imports
+import json
+import time
+
+# SRv6 dependencies
+from srv6_parallel import NodeWorkerPool
+
+# A SRv6 policy: traffic towards prefix is steered through the segments
+SRv6Policy = namedtuple('SRv6Policy', ['prefix', 'segments', 'device'])
+
+# Encapsulation modes of the policies
+SEG6_MODES = ['encap', 'inline']
+
+# Prefix of a policy in the normalized form, e.g. 2001::1 is 2001::1/128
+def policyPrefix(prefix):
+  return str(IPv6Network(unicode(prefix), strict=False))
+
+# Build a policy validating prefix and segments, a SRv6Policy
+# or a plain (prefix, segments, device) tuple can be given
+def makePolicy(prefix, segments, device):
+  if len(segments) == 0:
+    raise ValueError("policy for %s without segments" % prefix)
+  prefix = policyPrefix(prefix)
+  segments = tuple(str(IPv6Address(unicode(segment))) for segment in segments)
+  return SRv6Policy(prefix, segments, str(device))
+
+# ip -batch line installing the policy
+def policyLine(policy, mode='encap'):
+  return "route replace %s encap seg6 mode %s segs %s dev %s\n" %(policy.prefix,
+    mode, ",".join(policy.segments), policy.device)
+
+# Load the policies of the nodes from a json file
+# {"node": [["prefix", ["segment", ...], "device"], ...], ...}
+def loadPolicies(path):
+  with open(path) as infile:
+    data = json.load(infile)
+  return dict((str(node), [makePolicy(*entry) for entry in entries])
+    for node, entries in data.iteritems())
+
+# Outcome of a bulk operation on a node
+class PolicyResult(object):
+
+  def __init__(self, installed, deleted, elapsed):
+    self.installed = installed
+    self.deleted = deleted
+    self.elapsed = elapsed
+
+  # Policies per second
+  def throughput(self):
+    if self.elapsed == 0:
+      return 0
+    return (self.installed + self.deleted) / self.elapsed
+
+# Replace the policies of several nodes in parallel and log the throughput
+def replaceAllPolicies(net, policies, workers=1, mode='encap'):
+  nodes = [net.get(node) for node in sorted(policies)]
+  start = time.time()
+  results, errors = NodeWorkerPool(workers).run("Installing policies",
+    lambda node: node.replacePolicies(policies[node.name], mode), nodes)
+  total = PolicyResult(sum(result.installed for result in results.itervalues()),
+    sum(result.deleted for result in results.itervalues()), time.time() - start)
+  info("*** Policies: %d operations on %d nodes in %.3fs (%.0f/s)\n" %(total.installed +
+    total.deleted, len(results), total.elapsed, total.throughput()))
+  return results, errors
@@ -0,0 +1,151 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Link shaping for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from collections import defaultdict
+
+# Mininet
+from mininet.log import info, error
+# General imports
+import re
+import time
+
+# Shaping modes: tclink shapes every link with TCLink (htb and netem),
+# batch applies a single qdisc per interface with tc -batch, none
+# does not shape
+SHAPING_MODES = ['tclink', 'batch', 'none']
+# Packets of the netem queue at least, it has to hold the bandwidth delay product
+NETEM_LIMIT = 1000
+# Bytes per packet used to size the queues
+PACKET_SIZE = 1500
+# Latency of the tbf queue in ms
+TBF_LATENCY = 50
+
+# Parse a tc time (a number is in usec) in usec
+def toUsec(value):
+  if value is None:
+    return 0
+  match = re.match(r"^\s*([0-9.]+)\s*(s|sec|ms|msec|us|usec)?\s*$", str(value))
+  if not match:
+    raise ValueError("invalid delay %s" % value)
+  scale = {'s': 1e6, 'sec': 1e6, 'ms': 1e3, 'msec': 1e3}.get(match.group(2), 1)
+  return float(match.group(1)) * scale
+
+# True if the link needs a qdisc
+def isShaped(bw, delay):
+  return bool(bw) or toUsec(delay) > 0
+
+# tc -batch lines shaping the egress of an interface: netem applies
+# delay and rate in one qdisc, tbf is used if there is no delay
+def shapingLines(intf, bw=None, delay=None):
+  usec = toUsec(delay)
+  if usec > 0:
+    limit = NETEM_LIMIT
+    rate = ""
+    if bw:
+      # Twice the bandwidth delay product in packets
+      limit = max(limit, int(2 * bw * 1e6 / 8 * usec / 1e6 / PACKET_SIZE))
+      rate = " rate %sMbit" % bw
+    return ["qdisc replace dev %s root netem delay %dus%s limit %d" %(intf, usec, rate, limit)]
+  if bw:
+    # Burst of 4ms at the given rate
+    burst = max(PACKET_SIZE * 2, int(bw * 1e6 / 8 / 250))
+    return ["qdisc replace dev %s root tbf rate %sMbit burst %d latency %dms"
+      %(intf, bw, burst, TBF_LATENCY)]
+  return []
+
+# Applies the shaping of the core links described by the topology
+# graph, the mgmt links are not in the graph and are never shaped
+class ShapingEngine(object):
+
+  def __init__(self, net, topology):
+    self.net = net
+    self.topology = topology
+
+  # Lines of each router for the given directed edges (lhs, rhs, data)
+  def plan(self, edges):
+    lines = defaultdict(list)
+    for lhs, rhs, data in edges:
+      if isShaped(data.get('bw'), data.get('delay')):
+        lines[lhs].extend(shapingLines(data['lhs_intf'], data.get('bw'), data.get('delay')))
+    return lines
+
+  # Shape the given edges, all the core links by default
+  def apply(self, edges=None):
+    if edges is None:
+      edges = self.topology.edges(data=True)
+    lines = self.plan(edges)
+    routers = [self.net.get(router) for router in sorted(lines) if router in self.net]
+    self.net.pool.run("Shaping links", lambda router: self.applyRouter(router, lines[router.name]),
+      routers)
+    info("*** Shaped %d interfaces of %d routers\n" %(sum(len(router_lines)
+      for router_lines in lines.itervalues()), len(routers)))
+
+  # Single tc invocation for all the interfaces of the router
+  def applyRouter(self, router, lines):
+    path = "%s/shaping.batch" % router.dir
+    with open(path, 'w') as outfile:
+      outfile.write("\n".join(lines) + "\n")
+    output = router.cmd("tc -force -batch %s 2>&1; echo $?" % path)
+    if int(output.strip().splitlines()[-1]) != 0:
+      raise RuntimeError("%s: tc -batch failed\n%s" %(router.name, output))
+
+  # Measure delay and bandwidth of some shaped links against the
+  # requested values. Links are measured one at a time
+  def validate(self, samples=5, duration=2):
+    edges = [(lhs, rhs, data) for lhs, rhs, data in self.topology.edges(data=True)
+      if lhs < rhs and isShaped(data.get('bw'), data.get('delay'))]
+    results = []
+    for lhs, rhs, data in sorted(edges, key=lambda edge: edge[2]['lhs_intf'])[:samples]:
+      results.append(self.measure(lhs, rhs, data, duration))
+    for result in results:
+      info("*** %s-%s: bw %s/%s Mbit/s, delay %.3f/%.3f ms\n" %(result['lhs'], result['rhs'],
+        "%.2f" % result['bw'] if result['bw'] is not None else "-", result['requested_bw'],
+        result['delay'] if result['delay'] is not None else -1, result['requested_delay']))
+    return results
+
+  # Ping gives the delay (half rtt), iperf the bandwidth from lhs to rhs
+  def measure(self, lhs, rhs, data, duration):
+    lhs_router = self.net.get(lhs)
+    rhs_router = self.net.get(rhs)
+    address = data['rhs_ip'].split("/")[0]
+    result = {'lhs': lhs, 'rhs': rhs, 'requested_bw': data.get('bw'),
+      'requested_delay': toUsec(data.get('delay')) / 1e3, 'bw': None, 'delay': None}
+    output = lhs_router.cmd("ping -6 -c 5 -i 0.2 -q %s" % address)
+    match = re.search(r"= [0-9.]+/([0-9.]+)/", output)
+    if match:
+      result['delay'] = float(match.group(1)) / 2
+    else:
+      error("*** %s-%s: ping failed\n" %(lhs, rhs))
+    rhs_router.cmd("iperf -s -V -B %s > /dev/null 2>&1 &" % address)
+    server = rhs_router.lastPid
+    time.sleep(0.5)
+    output = lhs_router.cmd("iperf -V -c %s -t %d -y C" %(address, duration))
+    rhs_router.cmd("kill %d" % server)
+    lines = [line for line in output.splitlines() if line.count(",") >= 8]
+    if len(lines) > 0:
+      result['bw'] = float(lines[-1].split(",")[8]) / 1e6
+    else:
+      error("*** %s-%s: iperf failed\n" %(lhs, rhs))
+    return result
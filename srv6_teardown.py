@@ -0,0 +1,193 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Targeted teardown for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+# Mininet
+from mininet.log import info
+# General imports
+import errno
+import json
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+
+# SRv6 dependencies
+from srv6_parallel import NodeWorkerPool
+from srv6_utils import routerDir, MGMT_NODE, MGMT_BRIDGE, SHELL_PID
+
+# Daemons started by the routers, stopped before the shell
+DAEMONS = ['ospf6d', 'zebra', 'sshd']
+
+# Read a pid file, None if missing or invalid
+def readPid(path):
+  try:
+    with open(path) as infile:
+      return int(infile.read().split()[0])
+  except (IOError, ValueError, IndexError):
+    return None
+
+# True if the process exists and its command line contains the token,
+# this avoids to kill a process that reused the pid
+def isProcess(pid, token):
+  try:
+    with open("/proc/%d/cmdline" % pid) as infile:
+      return token in infile.read()
+  except IOError:
+    return False
+
+# Send a signal ignoring processes already gone
+def kill(pid, signum):
+  try:
+    os.kill(pid, signum)
+  except OSError as e:
+    if e.errno != errno.ESRCH:
+      raise
+
+# Hang up the process group of a node shell, as Node.terminate does,
+# the shell leads its own group (mnexec -s)
+def hangup(pid):
+  try:
+    os.killpg(pid, signal.SIGHUP)
+  except OSError as e:
+    if e.errno != errno.ESRCH:
+      raise
+    # A shell that is not the leader of its group
+    kill(pid, signal.SIGHUP)
+
+# Shells of the Mininet nodes, the last argument is mininet:<name>
+def mininetShells():
+  shells = {}
+  for entry in os.listdir("/proc"):
+    if not entry.isdigit():
+      continue
+    try:
+      with open("/proc/%s/cmdline" % entry) as infile:
+        args = infile.read().split("\0")
+    except IOError:
+      continue
+    args = [arg for arg in args if arg != ""]
+    if len(args) > 0 and args[-1].startswith("mininet:"):
+      shells[args[-1][len("mininet:"):]] = int(entry)
+  return shells
+
+# Processes and files of a node of the emulation
+class NodeState(object):
+
+  def __init__(self, name, shell=None):
+    self.name = name
+    self.dir = routerDir(name)
+    # Pid of the shell found in /proc, used if the pid file is missing
+    self.shell = shell
+
+  # Processes of the node as (pid, token) pairs, daemons first
+  def processes(self):
+    processes = []
+    for daemon in DAEMONS:
+      pid = readPid("%s/%s.pid" %(self.dir, daemon))
+      if pid is not None and isProcess(pid, daemon):
+        processes.append((pid, daemon))
+    # Mininet names the shell of the node mininet:<name>
+    pid = readPid("%s/%s" %(self.dir, SHELL_PID))
+    if pid is None:
+      pid = self.shell
+    if pid is not None and isProcess(pid, "mininet:%s" % self.name):
+      processes.append((pid, "mininet:%s" % self.name))
+    return processes
+
+  # Terminate the daemons, kill them after the timeout, hang up
+  # the shell and remove the files
+  def stop(self, timeout=5, processes=None):
+    if processes is None:
+      processes = self.processes()
+    shell = "mininet:%s" % self.name
+    daemons = [(pid, token) for pid, token in processes if token != shell]
+    for pid, _ in daemons:
+      kill(pid, signal.SIGTERM)
+    deadline = time.time() + timeout
+    alive = daemons
+    while len(alive) > 0 and time.time() < deadline:
+      time.sleep(0.05)
+      alive = [(pid, token) for pid, token in alive if isProcess(pid, token)]
+    for pid, _ in alive:
+      kill(pid, signal.SIGKILL)
+    # The interactive shell ignores SIGTERM, stop it as Mininet does
+    for pid, token in processes:
+      if token == shell:
+        hangup(pid)
+    if os.path.exists(self.dir):
+      shutil.rmtree(self.dir, ignore_errors=True)
+    return len(processes)
+
+# Stops only the processes and links of this emulation using the
+# dump of the topology and the pid files of the nodes
+class EmulationTeardown(object):
+
+  def __init__(self, topology_file, workers=1, timeout=5):
+    self.topology_file = topology_file
+    self.pool = NodeWorkerPool(workers)
+    self.timeout = timeout
+
+  # Nodes and interfaces of the emulation
+  def load(self):
+    with open(self.topology_file) as infile:
+      topology = json.load(infile)
+    nodes = [node['id'] for node in topology['nodes']]
+    # Core interfaces and mgmt interfaces of the routers
+    intfs = set()
+    for link in topology['links']:
+      intfs.add(link['lhs_intf'])
+      intfs.add(link['rhs_intf'])
+    intfs.update("%s-eth0" % node for node in nodes + [MGMT_NODE])
+    return nodes + [MGMT_NODE], sorted(intfs)
+
+  # Delete the interfaces left in the root namespace and the mgmt switch
+  def cleanRoot(self, intfs):
+    devnull = open(os.devnull, 'w')
+    try:
+      with tempfile.NamedTemporaryFile(suffix=".batch") as batch:
+        batch.write("".join("link del %s\n" % intf for intf in intfs))
+        batch.flush()
+        subprocess.call(["ip", "-force", "-batch", batch.name], stdout=devnull, stderr=devnull)
+      subprocess.call(["ovs-vsctl", "--if-exists", "del-br", MGMT_BRIDGE],
+        stdout=devnull, stderr=devnull)
+    finally:
+      devnull.close()
+
+  # Tear down the emulation
+  def run(self):
+    start = time.time()
+    if not os.path.exists(self.topology_file):
+      info("*** Nothing to tear down, %s not found\n" % self.topology_file)
+      return
+    nodes, intfs = self.load()
+    # Stop the nodes in parallel, this removes their namespaces
+    shells = mininetShells()
+    results, _ = self.pool.run("Stopping nodes", lambda node: node.stop(self.timeout),
+      [NodeState(node, shells.get(node)) for node in nodes])
+    self.cleanRoot(intfs)
+    info("*** Teardown: %d nodes, %d processes stopped, %d interfaces in %.3fs\n" %(
+      len(nodes), sum(results.values()), len(intfs), time.time() - start))
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Telemetry of the routers for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from multiprocessing.pool import ThreadPool
+
+# Mininet
+from mininet.log import info, error
+# General imports
+import json
+import subprocess
+import threading
+import time
+
+# Counters of each interface, in the order of the samples
+COUNTERS = ['rx_bytes', 'rx_packets', 'rx_drop', 'tx_bytes', 'tx_packets', 'tx_drop']
+# Columns of /proc/net/dev of the counters
+DEV_COLUMNS = [0, 1, 3, 8, 9, 11]
+
+# Parse /proc/net/dev keeping only the given interfaces
+def parseNetDev(data, intfs):
+  counters = {}
+  for line in data.splitlines()[2:]:
+    name, _, values = line.partition(":")
+    name = name.strip()
+    if name in intfs:
+      values = values.split()
+      counters[name] = [int(values[column]) for column in DEV_COLUMNS]
+  return counters
+
+# Count the routes and the seg6 routes in the output of ip -6 route
+def countRoutes(output):
+  routes = 0
+  seg6 = 0
+  for line in output.splitlines():
+    if len(line) == 0 or line[0].isspace():
+      continue
+    routes += 1
+    if "encap seg6" in line:
+      seg6 += 1
+  return routes, seg6
+
+# Samples the routers of the topology graph in parallel. Counters are
+# read from /proc/<pid>/net/dev of the node shell, which shows the
+# namespace of the node, and routes with ip run in the namespace:
+# the shells of the nodes are not used, so the CLI is not disturbed.
+# Samples are appended to the output file as json lines and are not
+# kept in memory, long runs only grow the file
+class TelemetryCollector(object):
+
+  def __init__(self, net, topology, path, interval=1, workers=1):
+    self.net = net
+    self.topology = topology
+    self.path = path
+    self.interval = interval
+    self.workers = max(1, workers)
+    self.stopped = threading.Event()
+    self.thread = None
+
+  # Interfaces of the routers recorded in the topology graph
+  def interfaces(self):
+    intfs = {}
+    for node, data in self.topology.nodes(data=True):
+      if data.get('type') == "router":
+        intfs[node] = set()
+    for lhs, rhs, data in self.topology.edges(data=True):
+      intfs.setdefault(lhs, set()).add(data['lhs_intf'])
+    return intfs
+
+  # Sample a single router
+  def sampleRouter(self, target):
+    name, pid, intfs = target
+    try:
+      with open("/proc/%d/net/dev" % pid) as infile:
+        counters = parseNetDev(infile.read(), intfs)
+      proc = subprocess.Popen(['mnexec', '-a', str(pid), 'ip', '-6', 'route', 'show'],
+        stdout=subprocess.PIPE)
+      routes = countRoutes(proc.communicate()[0])
+    except (IOError, OSError):
+      # Removed while sampling
+      return None
+    return name, list(routes), counters
+
+  # One sample of all the routers
+  def sample(self, pool):
+    targets = []
+    for name, intfs in sorted(self.interfaces().iteritems()):
+      node = self.net.nameToNode.get(name, None)
+      if node is not None and node.pid is not None:
+        targets.append((name, node.pid, intfs))
+    results = pool.map(self.sampleRouter, targets)
+    sample = {'t': round(time.time(), 3), 'routes': {}, 'counters': {}}
+    for result in results:
+      if result is not None:
+        name, routes, counters = result
+        sample['routes'][name] = routes
+        sample['counters'][name] = counters
+    return sample
+
+  # Sample until stopped, the file is written as the samples are taken
+  def run(self):
+    pool = ThreadPool(self.workers)
+    try:
+      with open(self.path, 'w') as outfile:
+        outfile.write(json.dumps({'interval': self.interval, 'routes': ['routes', 'seg6'],
+          'counters': COUNTERS}, separators=(',', ':'), sort_keys=True) + "\n")
+        while not self.stopped.is_set():
+          start = time.time()
+          sample = self.sample(pool)
+          outfile.write(json.dumps(sample, separators=(',', ':'), sort_keys=True) + "\n")
+          outfile.flush()
+          self.stopped.wait(max(0, self.interval - (time.time() - start)))
+    except Exception as e:
+      error("*** Telemetry stopped: %s\n" % e)
+    finally:
+      pool.close()
+      pool.join()
+
+  def start(self):
+    info("*** Collecting telemetry every %ss in %s\n" %(self.interval, self.path))
+    self.thread = threading.Thread(target=self.run, name="telemetry")
+    self.thread.daemon = True
+    self.thread.start()
+
+  def stop(self):
+    if self.thread is not None:
+      self.stopped.set()
+      self.thread.join()
+      self.thread = None
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Synthetic topology generator for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from optparse import OptionParser
+
+# General imports
+import json
+import math
+import random
+
+# Router names
+def routerName(index):
+  return "r%d" % index
+
+# Ring of n routers
+def ringLinks(n):
+  if n < 2:
+    return []
+  if n == 2:
+    return [(0, 1)]
+  return [(i, (i + 1) % n) for i in range(n)]
+
+# Grid of n routers, filled row by row
+def gridLinks(n):
+  side = int(math.ceil(math.sqrt(n)))
+  links = []
+  for i in range(n):
+    # Right neighbor in the same row
+    if (i + 1) % side != 0 and i + 1 < n:
+      links.append((i, i + 1))
+    # Neighbor in the next row
+    if i + side < n:
+      links.append((i, i + side))
+  return links
+
+# Fat-tree with the smallest even k having at least n routers:
+# (k/2)^2 core, k pods of k/2 aggregation and k/2 edge routers
+def fatTreeLinks(n):
+  k = 2
+  while 5 * k * k / 4 < n:
+    k = k + 2
+  half = k / 2
+  cores = range(half * half)
+  links = []
+  for pod in range(k):
+    base = len(cores) + pod * k
+    aggs = range(base, base + half)
+    edges = range(base + half, base + k)
+    for i, agg in enumerate(aggs):
+      # Each aggregation is connected to a group of core routers
+      for j in range(half):
+        links.append((cores[i * half + j], agg))
+      # And to all the edge routers of the pod
+      for edge in edges:
+        links.append((agg, edge))
+  return links
+
+# Connected random graph: a random spanning tree plus random
+# links up to the requested average degree
+def randomLinks(n, degree=3, seed=0):
+  rand = random.Random(seed)
+  links = set()
+  for i in range(1, n):
+    links.add((rand.randrange(i), i))
+  target = max(n - 1, int(n * degree / 2))
+  target = min(target, n * (n - 1) / 2)
+  while len(links) < target:
+    lhs, rhs = rand.randrange(n), rand.randrange(n)
+    if lhs == rhs:
+      continue
+    link = (min(lhs, rhs), max(lhs, rhs))
+    links.add(link)
+  return sorted(links)
+
+# Supported topologies
+TOPOLOGIES = {
+  'ring': ringLinks,
+  'grid': gridLinks,
+  'fattree': fatTreeLinks,
+  'random': randomLinks
+}
+
+# Generate a topology in the format of topo/example_srv6_topology.json
+def generateTopology(kind, n, bw=100, delay=1000, **kwargs):
+  links = TOPOLOGIES[kind](n, **kwargs)
+  # The fat-tree can have more routers than requested
+  count = max([n] + [max(link) + 1 for link in links])
+  vertices = [{
+      "info": {"type": "Router", "property": {}, "group": [200]},
+      "id": routerName(i)
+    } for i in range(count)]
+  edges = [{
+      "source": routerName(lhs),
+      "target": routerName(rhs),
+      "view": "Data",
+      "info": {"property": {"bw": bw, "delay": delay}, "group": ""}
+    } for lhs, rhs in links]
+  return {"edges": edges, "vertices": vertices,
+    "graph_parameters": {"testbed": "MININET"}}
+
+# Write a generated topology on file
+def writeTopology(path, kind, n, **kwargs):
+  with open(path, 'w') as outfile:
+    json.dump(generateTopology(kind, n, **kwargs), outfile)
+
+# Parse command line options
+def parseOptions():
+  parser = OptionParser()
+  # Kind of topology
+  parser.add_option('--kind', dest='kind', type='choice', choices=sorted(TOPOLOGIES),
+                    default='ring', help='Topology: %s' % ", ".join(sorted(TOPOLOGIES)))
+  # Number of routers
+  parser.add_option('--routers', dest='routers', type='int', default=10,
+                    help='Number of routers')
+  # Output file
+  parser.add_option('--output', dest='output', type='string', default="topology.json",
+                    help='Output topology file')
+  # Parse input parameters
+  (options, args) = parser.parse_args()
+  # Done, return
+  return options
+
+if __name__ == '__main__':
+  opts = parseOptions()
+  writeTopology(opts.output, opts.kind, opts.routers)
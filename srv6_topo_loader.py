@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Streaming topology loader for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+from decimal import Decimal
+
+# Mininet
+from mininet.log import info
+# General imports
+import json
+import resource
+import time
+
+# ijson allows to parse the file incrementally, without
+# it the whole file is loaded and then iterated
+try:
+  import ijson
+  from ijson.common import ObjectBuilder
+except ImportError:
+  ijson = None
+
+# Prefixes of the vertices and of the edges in the topology file
+VERTICES = 'vertices.item'
+EDGES = 'edges.item'
+
+# Iterate over the vertices and the edges of the topology file
+# yielding (prefix, item) pairs in file order
+def iterTopology(infile):
+  if ijson is None:
+    data = json.load(infile)
+    for prefix, key in [(VERTICES, 'vertices'), (EDGES, 'edges')]:
+      for item in data.get(key, []):
+        yield prefix, item
+    return
+  events = ijson.parse(infile)
+  for current, event, value in events:
+    if current not in (VERTICES, EDGES) or event not in ('start_map', 'start_array'):
+      continue
+    # Build the item until its end
+    prefix = current
+    builder = ObjectBuilder()
+    end_event = event.replace('start', 'end')
+    while (current, event) != (prefix, end_event):
+      builder.event(event, value)
+      current, event, value = next(events)
+    yield prefix, builder.value
+
+# ijson returns decimals for the real numbers
+def toNumber(value):
+  if isinstance(value, Decimal):
+    return float(value)
+  return value
+
+# Loads a topology file in a single pass, generating the properties
+# of routers and links while the items are read
+class SRv6TopoLoader(object):
+
+  def __init__(self, topo, generator, mgmtAllocator):
+    self.topo = topo
+    self.generator = generator
+    self.mgmtAllocator = mgmtAllocator
+    self.routers = []
+    self.routers_properties = []
+    self.core_links = []
+    self.core_links_properties = []
+
+  # Parse the file and fill routers, links and their properties
+  def load(self):
+    start = time.time()
+    with open(self.topo) as infile:
+      for prefix, item in iterTopology(infile):
+        if prefix == VERTICES:
+          self.addRouter(item)
+        else:
+          self.addCoreLink(item)
+    info("*** Loaded %d routers and %d core links in %.3fs, peak memory %d KB\n" %(
+      len(self.routers), len(self.core_links), time.time() - start,
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+  # Add a router and generate its properties
+  def addRouter(self, vertex):
+    vertex_info = vertex.get('info', {})
+    if vertex_info.get('type', None) != "Router":
+      return
+    router = vertex['id']
+    properties = dict((key, toNumber(value)) for key, value
+      in vertex_info.get('property', {}).iteritems())
+    generated = self.generator.getRoutersProperties([router])[0]
+    properties['loopback'] = generated.loopback
+    properties['routerid'] = generated.routerid
+    properties['mgmtip'] = self.mgmtAllocator.nextMgmtAddress()
+    self.routers.append(router)
+    self.routers_properties.append(properties)
+
+  # Add a core link and generate its properties
+  def addCoreLink(self, edge):
+    if edge.get('view', "Data") != "Data":
+      return
+    core_link = (edge['source'], edge['target'])
+    properties = dict((key, toNumber(value)) for key, value
+      in edge.get('info', {}).get('property', {}).iteritems())
+    generated = self.generator.getLinksProperties([core_link])[0]
+    properties['iplhs'] = generated.iplhs
+    properties['iprhs'] = generated.iprhs
+    properties['net'] = generated.net
+    self.core_links.append(core_link)
+    self.core_links_properties.append(properties)
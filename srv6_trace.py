@@ -0,0 +1,141 @@
+#!/usr/bin/python
+
+##############################################################################################
+# Copyright (C) 2018 Pier Luigi Ventre - (CNIT and University of Rome "Tor Vergata")
+# Copyright (C) 2018 Stefano Salsano - (CNIT and University of Rome "Tor Vergata")
+# www.uniroma2.it/netgroup - www.cnit.it
+#
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Tracing for Segment Routing IPv6
+#
+# @author Pier Luigi Ventre <pierventre@hotmail.com>
+# @author Stefano Salsano <stefano.salsano@uniroma2.it>
+
+# Mininet
+from mininet.log import info
+# General imports
+import json
+import os
+import threading
+import time
+
+# Global tracer, None when tracing is disabled
+tracer = None
+
+# Collects spans and shell commands and exports them
+# in the Chrome trace event format
+class Tracer(object):
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.pid = os.getpid()
+    # Complete events
+    self.events = []
+    # Trace threads: one for each node plus the main one
+    self.tids = {}
+    # Commands in flight by node
+    self.inflight = {}
+    # Number and total latency of the commands by node
+    self.commands = {}
+
+  # Trace thread of a node (or of the pipeline)
+  def tid(self, node):
+    with self.lock:
+      if node not in self.tids:
+        self.tids[node] = len(self.tids) + 1
+      return self.tids[node]
+
+  # Record a complete event, times in seconds
+  def complete(self, name, cat, start, elapsed, node="deploy", args=None):
+    event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid,
+      'tid': self.tid(node), 'ts': int(start * 1e6), 'dur': int(elapsed * 1e6)}
+    if args:
+      event['args'] = args
+    self.events.append(event)
+
+  # Record the start of a command executed by a node
+  def commandStart(self, node, cmd):
+    self.inflight[node] = (cmd, time.time())
+
+  # Record the end of a command executed by a node
+  def commandEnd(self, node):
+    cmd, start = self.inflight.pop(node)
+    elapsed = time.time() - start
+    with self.lock:
+      count, total = self.commands.get(node, (0, 0.0))
+      self.commands[node] = (count + 1, total + elapsed)
+    self.complete(cmd.split(" ", 1)[0], "cmd", start, elapsed, node, {'cmd': cmd})
+
+  # Write the trace, the commands still running are begin events
+  def write(self, path):
+    events = list(self.events)
+    for node, (cmd, start) in self.inflight.items():
+      events.append({'name': cmd.split(" ", 1)[0], 'cat': "cmd", 'ph': 'B', 'pid': self.pid,
+        'tid': self.tid(node), 'ts': int(start * 1e6), 'args': {'cmd': cmd}})
+    for node, tid in self.tids.items():
+      events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+        'args': {'name': node}})
+    commands = dict((node, {'count': count, 'latency': total})
+      for node, (count, total) in self.commands.items())
+    with open(path, 'w') as outfile:
+      json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+        'otherData': {'commands': commands}}, outfile)
+    info("*** Trace with %d events written in %s\n" %(len(events), path))
+
+  # Log number and latency of the commands of each node
+  def summary(self):
+    for node in sorted(self.commands):
+      count, total = self.commands[node]
+      info("*** %s: %d commands, %.3fs\n" %(node, count, total))
+
+# Span of the pipeline, it does nothing when tracing is disabled
+class Span(object):
+
+  def __init__(self, name, cat, node):
+    self.name = name
+    self.cat = cat
+    self.node = node
+
+  def __enter__(self):
+    self.start = time.time()
+    return self
+
+  def __exit__(self, *args):
+    if tracer is not None:
+      tracer.complete(self.name, self.cat, self.start, time.time() - self.start, self.node)
+    return False
+
+# Shared span used when tracing is disabled
+class NullSpan(object):
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    return False
+
+NULL_SPAN = NullSpan()
+
+# Timed span of a phase of the pipeline or of a node
+def span(name, cat="phase", node="deploy"):
+  if tracer is None:
+    return NULL_SPAN
+  return Span(name, cat, node)
+
+# Enable the tracing
+def enableTracing():
+  global tracer
+  tracer = Tracer()
+  return tracer
@@ -24,13 +24,93 @@
 # @author Stefano Salsano <stefano.salsano@uniroma2.it>
 
 from srv6_generators import *
+import srv6_trace
+from srv6_policy import makePolicy, policyPrefix, policyLine, PolicyResult
 
 # Mininet
 from mininet.node import Host
+from mininet.log import info, debug
 # General imports
+from collections import OrderedDict
+import errno
+import grp
+import pwd
 import re
 import os
 import shutil
+import time
+
+# Owner and permissions of the Quagga configs
+QUAGGA_USER = "quagga"
+QUAGGA_GROUP = "quaggavty"
+QUAGGA_MODE = 0640
+
+# Name of the mgmt station and of the mgmt switch
+MGMT_NODE = "mgmt"
+MGMT_BRIDGE = "br-mgmt1"
+# Pid file of the node shell
+SHELL_PID = "shell.pid"
+
+# Working directory of a router
+def routerDir(name):
+  return "/tmp/%s" % name
+
+# Create a directory, it can be created concurrently by other threads
+def makeDir(path):
+  try:
+    os.makedirs(path)
+  except OSError as e:
+    if e.errno != errno.EEXIST:
+      raise
+
+# Uid and gid of the Quagga user and group, None if they do not exist
+def quaggaOwner():
+  try:
+    return pwd.getpwnam(QUAGGA_USER).pw_uid, grp.getgrnam(QUAGGA_GROUP).gr_gid
+  except KeyError:
+    return None
+
+# Write the configs of a router, one write per file, and set
+# ownership and permissions without spawning any process
+def writeQuaggaConfigs(dir, configs, owner=None):
+  makeDir(dir)
+  for filename, content in configs.iteritems():
+    path = "%s/%s" %(dir, filename)
+    with open(path, 'w') as outfile:
+      outfile.write(content)
+    if owner is not None:
+      os.chown(path, owner[0], owner[1])
+    os.chmod(path, QUAGGA_MODE)
+  if owner is not None:
+    os.chown(dir, owner[0], owner[1])
+
+# Render zebra.conf and ospf6d.conf of a router, nets includes the loopback
+def quaggaConfigs(name, dir, nets, routerid):
+  ospfd = ["! -*- ospf6 -*-\n!\nhostname %s\n" %name,
+    "password srv6\nlog file %s/ospf6d.log\n!\n" %dir]
+  zebra = ["! -*- zebra -*-\n!\nhostname %s\n" %name,
+    "password srv6\nenable password srv6\nlog file %s/zebra.log\n!\n" %dir]
+  # Iterate over the nets and build interface part of the configs
+  for net in nets:
+    cost = 1
+    ra_interval = 10
+    # To mitigate annoying warnings
+    if net['intf'] == 'lo':
+      ospfd.append("interface %s\n!ipv6 ospf6 cost %s\nipv6 ospf6 hello-interval %s\n!\n"
+        %(net['intf'], cost, 600))
+    else:
+      ospfd.append("interface %s\nipv6 ospf6 cost %s\nipv6 ospf6 hello-interval %s\n!\n"
+        %(net['intf'], cost, 1))
+    zebra.append("interface %s\nlink-detect\nno ipv6 nd suppress-ra\nipv6 nd ra-interval %s\nipv6 address %s\nipv6 nd prefix %s\n!\n"
+      %(net['intf'], ra_interval, net['ip'], net['net']))
+  # Finishing ospf6d conf
+  ospfd.append("router ospf6\nrouter-id %s\nredistribute static\n!\n" %routerid)
+  ospfd.append("area 0.0.0.0 range %s\n" %RANGE_FOR_AREA_0)
+  #Iterate again over the nets to finish area part
+  for net in nets:
+    ospfd.append("interface %s area 0.0.0.0\n" %(net['intf']))
+  ospfd.append("!\n")
+  return OrderedDict([('zebra.conf', "".join(zebra)), ('ospf6d.conf', "".join(ospfd))])
 
 # Abstraction to model a SRv6Router
 class SRv6Router(Host):
@@ -38,88 +118,299 @@ class SRv6Router(Host):
   def __init__(self, name, *args, **kwargs):
     dirs = ['/var/mininet']
     Host.__init__(self, name, privateDirs=dirs, *args, **kwargs)
-    self.dir = "/tmp/%s" % name
+    self.dir = routerDir(name)
     self.nets = []
-    if not os.path.exists(self.dir):
-      os.makedirs(self.dir) 
+    # Installed SRv6 policies and their modes by prefix
+    self.policies = OrderedDict()
+    makeDir(self.dir)
 
   # Config hook
   def config(self, **kwargs):
     # Init steps
     Host.config(self, **kwargs)
+    # Save the pid of the shell for the targeted teardown
+    with open("%s/%s" %(self.dir, SHELL_PID), 'w') as outfile:
+      outfile.write("%d\n" % self.pid)
+    # Batch mode collects all the commands and applies them at once
+    self.batch = kwargs.get('batch', False)
+    # Routing mode: ospf runs Quagga, static does not start any daemon
+    self.routing = kwargs.get('routing', 'ospf')
+    self.routerid = kwargs.get('routerid', None)
+    # Per-phase timing of the configuration
+    self.timings = OrderedDict()
+    # Commands to be executed in the node shell by phase
+    self.script = OrderedDict()
+    # Inputs for ip -batch (flush of IPv4 addresses and IPv6 addresses)
+    self.addr4 = []
+    self.addr6 = []
+    # Inputs for sysctl -p
+    self.sysctls = []
+    start = self.startPhase('interfaces')
     # Iterate over the interfaces
     first = True
     for intf in self.intfs.itervalues():
       # Remove any configured address
-      self.cmd('ifconfig %s 0' %intf.name)
+      self.ip4('addr flush dev %s' %intf.name, 'ifconfig %s 0' %intf.name)
       # For the first one, let's configure the mgmt address
       if first:
         first = False
-        self.cmd('ip a a %s dev %s' %(kwargs['mgmtip'], intf.name))
+        self.ip6('addr add %s dev %s' %(kwargs['mgmtip'], intf.name))
     #let's write the hostname in /var/mininet/hostname
-    self.cmd("echo '" + self.name + "' > /var/mininet/hostname")
+    self.run("echo '" + self.name + "' > /var/mininet/hostname")
     # Retrieve nets
     if kwargs.get('nets', None):
       self.nets = kwargs['nets']
     # If requested
     if kwargs['sshd']:
       # Let's start sshd daemon in the hosts
-      self.cmd('/usr/sbin/sshd -D &')
+      self.run('/usr/sbin/sshd -D -o PidFile=%s/sshd.pid &' % self.dir)
     # Configure the loopback address
     if kwargs.get('loopbackip', None):
-      self.cmd('ip a a %s dev lo' %(kwargs['loopbackip']))
+      self.ip6('addr add %s dev lo' %(kwargs['loopbackip']))
       self.nets.append({'intf':'lo', 'ip':kwargs['loopbackip'], 'net':kwargs['loopbackip']})
+    # Without zebra the addresses of the core links are configured here
+    if self.routing == 'static':
+      for net in self.nets:
+        if net['intf'] != 'lo':
+          self.ip6('addr add %s dev %s nodad' %(net['ip'], net['intf']))
+    self.endPhase('interfaces', start)
+    start = self.startPhase('sysctl')
     # Enable IPv6 forwarding
-    self.cmd("sysctl -w net.ipv6.conf.all.forwarding=1")
+    self.sysctl("net.ipv6.conf.all.forwarding", 1)
     # Enable SRv6 on the interface
-    self.cmd("sysctl -w net.ipv6.conf.all.seg6_enabled=1")
+    self.sysctl("net.ipv6.conf.all.seg6_enabled", 1)
     # Disable RA accept
-    self.cmd("sysctl -w net.ipv6.conf.all.accept_ra=0")
+    self.sysctl("net.ipv6.conf.all.accept_ra", 0)
     # Iterate over the interfaces
     for intf in self.intfs.itervalues():
       # Enable IPv6 forwarding
-      self.cmd("sysctl -w net.ipv6.conf.%s.forwarding=1" %intf.name)
+      self.sysctl("net.ipv6.conf.%s.forwarding" %intf.name, 1)
       # Enable SRv6 on the interface
-      self.cmd("sysctl -w net.ipv6.conf.%s.seg6_enabled=1" %intf.name)
-    # Zebra and Quagga config
-    if len(self.nets) > 0:
-      zebra = open("%s/zebra.conf" % self.dir, 'w')
-      ospfd = open("%s/ospf6d.conf" % self.dir, 'w')
-      ospfd.write("! -*- ospf6 -*-\n!\nhostname %s\n" %self.name)
-      ospfd.write("password srv6\nlog file %s/ospf6d.log\n!\n" %self.dir)
-      zebra.write("! -*- zebra -*-\n!\nhostname %s\n" %self.name)
-      zebra.write("password srv6\nenable password srv6\nlog file %s/zebra.log\n!\n" %self.dir)
-      # Iterate over the nets and build interface part of the configs
-      for net in self.nets:
-        cost = 1
-        ra_interval = 10
-        # To mitigate annoying warnings
-        if net['intf'] == 'lo':
-          ospfd.write("interface %s\n!ipv6 ospf6 cost %s\nipv6 ospf6 hello-interval %s\n!\n"
-            %(net['intf'], cost, 600))
-        else:
-          ospfd.write("interface %s\nipv6 ospf6 cost %s\nipv6 ospf6 hello-interval %s\n!\n"
-            %(net['intf'], cost, 1))
-        zebra.write("interface %s\nlink-detect\nno ipv6 nd suppress-ra\nipv6 nd ra-interval %s\nipv6 address %s\nipv6 nd prefix %s\n!\n"
-          %(net['intf'], ra_interval, net['ip'], net['net']))
-      # Finishing ospf6d conf
-      if kwargs.get('routerid', None):
-        routerid = kwargs['routerid']
-      ospfd.write("router ospf6\nrouter-id %s\nredistribute static\n!\n" %routerid)
-      ospfd.write("area 0.0.0.0 range %s\n" %RANGE_FOR_AREA_0)
-      #Iterate again over the nets to finish area part
+      self.sysctl("net.ipv6.conf.%s.seg6_enabled" %intf.name, 1)
+    # Without zebra nothing adds back the addresses removed when a core link goes down
+    if self.routing == 'static':
       for net in self.nets:
-        ospfd.write("interface %s area 0.0.0.0\n" %(net['intf']))
-      ospfd.write("!\n")
-      ospfd.close()
-      zebra.close()
-      # Right permission and owners
-      self.cmd("chown quagga.quaggavty %s/*.conf" %self.dir)
-      self.cmd("chown quagga.quaggavty %s/." %self.dir)
-      self.cmd("chmod 640 %s/*.conf" %self.dir)
+        if net['intf'] != 'lo':
+          self.sysctl("net.ipv6.conf.%s.keep_addr_on_down" %net['intf'], 1)
+    self.endPhase('sysctl', start)
+    start = self.startPhase('quagga')
+    # Zebra and Quagga config
+    if self.routing == 'ospf' and len(self.nets) > 0:
+      # Configs can be already written by the preparation stage
+      if not kwargs.get('prepared', False):
+        # Use the configs rendered in advance if available
+        configs = kwargs.get('configs', None)
+        if not configs:
+          configs = quaggaConfigs(self.name, self.dir, self.nets, self.routerid)
+        # Write them with the right permission and owners
+        writeQuaggaConfigs(self.dir, configs, quaggaOwner())
+      self.endPhase('quagga', start)
+      start = self.startPhase('daemons')
       # Starting daemons
-      self.cmd("zebra -f %s/zebra.conf -d -z %s/zebra.sock -i %s/zebra.pid" %(self.dir, self.dir, self.dir))
-      self.cmd("ospf6d -f %s/ospf6d.conf -d -z %s/zebra.sock -i %s/ospf6d.pid" %(self.dir, self.dir, self.dir))
+      for daemon in self.daemonCommands():
+        self.run(daemon)
+      self.endPhase('daemons', start)
+    # In batch mode everything is applied here with a single command,
+    # the time of each step is added to the phase which queued it
+    if self.batch:
+      self.applyBatch()
+    debug("*** %s config timings: %s\n" %(self.name, ", ".join(
+      "%s=%.3fs" %(phase, elapsed) for phase, elapsed in self.timings.iteritems())))
+
+  # Commands starting the routing daemons
+  def daemonCommands(self):
+    return ["zebra -f %s/zebra.conf -d -z %s/zebra.sock -i %s/zebra.pid" %(self.dir, self.dir, self.dir),
+      "ospf6d -f %s/ospf6d.conf -d -z %s/zebra.sock -i %s/ospf6d.pid" %(self.dir, self.dir, self.dir)]
+
+  # Configure a core link added at runtime
+  def addNet(self, net):
+    self.nets.append(net)
+    self.cmd("sysctl -w net.ipv6.conf.%s.forwarding=1" %net['intf'])
+    self.cmd("sysctl -w net.ipv6.conf.%s.seg6_enabled=1" %net['intf'])
+    if self.routing == 'static':
+      self.cmd("sysctl -w net.ipv6.conf.%s.keep_addr_on_down=1" %net['intf'])
+      self.cmd("ip -6 addr add %s dev %s nodad" %(net['ip'], net['intf']))
+
+  # Forget a core link removed at runtime
+  def removeNet(self, intf):
+    self.nets = [net for net in self.nets if net['intf'] != intf]
+
+  # Render again the Quagga configs from the nets and restart the daemons
+  def restartRouting(self):
+    if self.routing != 'ospf':
+      return
+    for daemon in ['ospf6d', 'zebra']:
+      pidfile = "%s/%s.pid" %(self.dir, daemon)
+      self.cmd("pid=$(cat %s 2>/dev/null) && kill $pid && while kill -0 $pid 2>/dev/null; "
+        "do sleep 0.05; done" % pidfile)
+    writeQuaggaConfigs(self.dir, quaggaConfigs(self.name, self.dir, self.nets, self.routerid),
+      quaggaOwner())
+    for daemon in self.daemonCommands():
+      self.cmd(daemon)
+
+  # Trace the commands executed by the node
+  def cmd(self, *args, **kwargs):
+    tracer = srv6_trace.tracer
+    if tracer is None:
+      return Host.cmd(self, *args, **kwargs)
+    tracer.commandStart(self.name, " ".join(str(arg) for arg in args))
+    try:
+      return Host.cmd(self, *args, **kwargs)
+    finally:
+      tracer.commandEnd(self.name)
+
+  # Start a configuration phase, the commands queued in batch mode belong to it
+  def startPhase(self, phase):
+    self.phase = phase
+    return time.time()
+
+  # Save the time of a configuration phase
+  def endPhase(self, phase, start, end=None):
+    if end is None:
+      end = time.time()
+    elapsed = end - start
+    self.timings[phase] = self.timings.get(phase, 0) + elapsed
+    if srv6_trace.tracer is not None:
+      srv6_trace.tracer.complete(phase, "config", start, elapsed, self.name)
+
+  # Install the given routes and remove the deleted
+  # destinations with a single ip -batch
+  def installRoutes(self, routes, deleted=[]):
+    path = "%s/routes.batch" % self.dir
+    with open(path, 'w') as outfile:
+      for destination in deleted:
+        outfile.write("route del %s\n" % destination)
+      for route in routes:
+        # Multipath routes list all the next hops
+        if route.get('nexthops', None):
+          outfile.write("route replace %s %s\n" %(route['subnet'], " ".join(
+            "nexthop via %s dev %s" %(nexthop['gateway'], nexthop['device'])
+            for nexthop in route['nexthops'])))
+        else:
+          outfile.write("route replace %s via %s dev %s\n"
+            %(route['subnet'], route['gateway'], route['device']))
+    if self.ipBatch(path, force=True) != 0:
+      raise RuntimeError("%s: routes not installed, see %s.log" %(self.name, path))
+
+  # Apply an ip -batch file, returns the exit status
+  def ipBatch(self, path, force=False):
+    output = self.cmd("ip -6 %s-batch %s > %s.log 2>&1; echo $?"
+      %("-force " if force else "", path, path))
+    return int(output.strip().splitlines()[-1])
+
+  # Install or update the given (prefix, segments, device) policies in a single batch
+  def installPolicies(self, policies, mode='encap'):
+    return self.applyPolicies([makePolicy(*policy) for policy in policies], [], mode)
+
+  # Delete the policies of the given prefixes in a single batch
+  def deletePolicies(self, prefixes):
+    prefixes = [policyPrefix(prefix) for prefix in prefixes]
+    return self.applyPolicies([], [prefix for prefix in prefixes if prefix in self.policies])
+
+  # Replace the whole set of policies: stale policies are deleted, only
+  # new or changed policies are written. Routes are replaced in place
+  def replacePolicies(self, policies, mode='encap'):
+    policies = [makePolicy(*policy) for policy in policies]
+    wanted = set(policy.prefix for policy in policies)
+    stale = [prefix for prefix in self.policies if prefix not in wanted]
+    changed = [policy for policy in policies
+      if self.policies.get(policy.prefix) != (policy, mode)]
+    return self.applyPolicies(changed, stale, mode)
+
+  # All or nothing: if the batch fails the previous policies are restored
+  def applyPolicies(self, policies, deleted, mode='encap'):
+    start = time.time()
+    path = "%s/policies.batch" % self.dir
+    with open(path, 'w') as outfile:
+      for prefix in deleted:
+        outfile.write("route del %s\n" % prefix)
+      for policy in policies:
+        outfile.write(policyLine(policy, mode))
+    if self.ipBatch(path) != 0:
+      rollback = "%s/policies.rollback" % self.dir
+      with open(rollback, 'w') as outfile:
+        # The previous policies are restored with their own modes
+        for prefix in deleted:
+          outfile.write(policyLine(*self.policies[prefix]))
+        for policy in policies:
+          if policy.prefix in self.policies:
+            outfile.write(policyLine(*self.policies[policy.prefix]))
+          else:
+            outfile.write("route del %s\n" % policy.prefix)
+      self.ipBatch(rollback, force=True)
+      raise RuntimeError("%s: policies not installed, see %s.log" %(self.name, path))
+    for prefix in deleted:
+      del self.policies[prefix]
+    for policy in policies:
+      self.policies[policy.prefix] = (policy, mode)
+    return PolicyResult(len(policies), len(deleted), time.time() - start)
+
+  # Run a command in the node or queue it in batch mode
+  def run(self, cmd):
+    if self.batch:
+      self.script.setdefault(self.phase, []).append(cmd)
+    else:
+      self.cmd(cmd)
+
+  # Flush IPv4 addresses: cmd is the legacy command
+  def ip4(self, batch_cmd, cmd):
+    if self.batch:
+      self.addr4.append(batch_cmd)
+    else:
+      self.cmd(cmd)
+
+  # Run an ip -6 command or queue it in batch mode
+  def ip6(self, batch_cmd):
+    if self.batch:
+      self.addr6.append(batch_cmd)
+    else:
+      self.cmd('ip -6 %s' %batch_cmd)
+
+  # Set a sysctl value or queue it in batch mode
+  def sysctl(self, key, value):
+    if self.batch:
+      self.sysctls.append("%s = %s" %(key, value))
+    else:
+      self.cmd("sysctl -w %s=%s" %(key, value))
+
+  # Write the batch inputs and apply them with a single command. The steps
+  # are ip -batch and the commands of the interfaces phase, sysctl -p and the
+  # daemons, the script logs a timestamp after each of them
+  def applyBatch(self):
+    steps = OrderedDict((phase, []) for phase in ['interfaces', 'sysctl', 'daemons'])
+    if len(self.addr4) > 0:
+      with open("%s/addr4.batch" % self.dir, 'w') as outfile:
+        outfile.write("\n".join(self.addr4) + "\n")
+      steps['interfaces'].append("ip -4 -force -batch %s/addr4.batch" %self.dir)
+    if len(self.addr6) > 0:
+      with open("%s/addr6.batch" % self.dir, 'w') as outfile:
+        outfile.write("\n".join(self.addr6) + "\n")
+      steps['interfaces'].append("ip -6 -force -batch %s/addr6.batch" %self.dir)
+    if len(self.sysctls) > 0:
+      with open("%s/sysctl.conf" % self.dir, 'w') as outfile:
+        outfile.write("\n".join(self.sysctls) + "\n")
+      steps['sysctl'].append("sysctl -q -p %s/sysctl.conf" %self.dir)
+    for phase, commands in self.script.iteritems():
+      steps.setdefault(phase, []).extend(commands)
+    steps = [(phase, commands) for phase, commands in steps.iteritems() if len(commands) > 0]
+    # Build the final script: addresses and sysctls go first
+    times = "%s/config.times" % self.dir
+    script = ["#!/bin/sh", "set -e", "date +%%s.%%N > %s" % times]
+    for phase, commands in steps:
+      script.extend(commands)
+      script.append("date +%%s.%%N >> %s" % times)
+    with open("%s/config.sh" % self.dir, 'w') as outfile:
+      outfile.write("\n".join(script) + "\n")
+    # Single round-trip through the node shell
+    output = self.cmd("sh %s/config.sh > %s/config.log 2>&1; echo $?" %(self.dir, self.dir))
+    if int(output.strip().splitlines()[-1]) != 0:
+      with open("%s/config.log" % self.dir) as infile:
+        log = infile.read().strip()
+      raise RuntimeError("%s: batch configuration failed: %s" %(self.name, log))
+    with open(times) as infile:
+      stamps = [float(line) for line in infile.read().split()]
+    for (phase, _), start, end in zip(steps, stamps, stamps[1:]):
+      self.endPhase(phase, start, end)
 
   # Clean up the environment
   def cleanup(self):
@@ -129,3 +420,19 @@ class SRv6Router(Host):
       shutil.rmtree(self.dir)
 
 
+# Aggregate by phase the configuration timings of the given routers
+def configTimings(routers):
+  totals = OrderedDict()
+  for router in routers:
+    for phase, elapsed in getattr(router, 'timings', {}).iteritems():
+      totals[phase] = totals.get(phase, 0) + elapsed
+  return totals
+
+# Log the per-phase configuration timings of the given routers
+def logConfigTimings(routers):
+  totals = configTimings(routers)
+  if len(totals) == 0:
+    return
+  info("*** Configuration timings (%d nodes): %s, total=%.3fs\n" %(len(routers),
+    ", ".join("%s=%.3fs" %(phase, elapsed) for phase, elapsed in totals.iteritems()),
+    sum(totals.values())))